@@ -1,5 +1,5 @@
 import pysicgl
-from pysicgl_utils import Display
+from pysicgl_utils import Display, scalar_field
 from hidden_shades import timebase
 from hidden_shades.timewarp import TimeWarp
 from hidden_shades.variables.responder import VariableResponder
@@ -37,7 +37,6 @@ def frames(layer):
     screen = layer.canvas.screen
     display = Display(screen)
     timewarp = TimeWarp(lambda: timebase.seconds())
-    field = [0.0] * screen.pixels
 
     # use a dictionary to store mutable state
     # this state can be modified as a side effect of other
@@ -78,13 +77,10 @@ def frames(layer):
             efy = one_over_one_minus_e
 
         # use the scale and direction signs to compute a scalar field
-        for info in display.pixel_info():
-            idx, coordinates, position = info
-            x, y = position
+        dx, dy = display.centered((cx + ox, cy + oy))
+        field = scale * (efx * abs(dx) + efy * abs(dy))
 
-            field[idx] = scale * (efx * abs(x - cx - ox) + efy * abs(y - cy - oy))
-
-        state["scalar_field"] = pysicgl.ScalarField(field)  # return the scalar field
+        state["scalar_field"] = scalar_field(field)  # return the scalar field
 
     # a callback function to handle changes to declared variables
     def handle_variable_changes(variable):
@@ -137,7 +133,10 @@ def frames(layer):
     compute_scalar_field()
 
     while True:
-        yield None
+        # when the speed is zero the output only depends on the variables and
+        # palette so it may be cached
+        speed = layer.variable_manager.variables["speed"].value
+        yield layer.FRAME_DYNAMIC if speed else layer.FRAME_STATIC
 
         # apply the scalar field to the canvas by mapping against the layer palette
         offset = timewarp.local()
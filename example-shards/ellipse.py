@@ -1,6 +1,7 @@
 import math
+import numpy
 import pysicgl
-from pysicgl_utils import Display
+from pysicgl_utils import Display, scalar_field
 from hidden_shades import timebase
 from hidden_shades.timewarp import TimeWarp
 from hidden_shades.variables.responder import VariableResponder
@@ -38,7 +39,6 @@ def frames(layer):
     screen = layer.canvas.screen
     display = Display(screen)
     timewarp = TimeWarp(lambda: timebase.seconds())
-    field = [0.0] * screen.pixels
 
     state = {
         "scalar_field": None,
@@ -96,15 +96,10 @@ def frames(layer):
             efy = one_over_one_minus_e_squared_squared
 
         # use the scale and direction signs to compute a scalar field
-        for info in display.pixel_info():
-            idx, coordinates, position = info
-            x, y = position
+        dx, dy = display.centered((cx + ox, cy + oy))
+        field = scale * numpy.sqrt(dx * dx * efx + dy * dy * efy)
 
-            field[idx] = scale * math.sqrt(
-                math.pow(x - cx - ox, 2) * efx + math.pow(y - cy - oy, 2) * efy
-            )
-
-        state["scalar_field"] = pysicgl.ScalarField(field)
+        state["scalar_field"] = scalar_field(field)
 
     # a callback function to handle changes to declared variables
     def handle_variable_changes(variable):
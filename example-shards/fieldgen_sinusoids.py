@@ -1,6 +1,6 @@
+import numpy
 import pysicgl
-import math
-from pysicgl_utils import Display
+from pysicgl_utils import Display, scalar_field
 from hidden_shades import timebase
 from hidden_shades.timewarp import TimeWarp
 from hidden_shades.variables.responder import VariableResponder
@@ -15,9 +15,6 @@ def frames(layer):
     (numx, numy) = display.extent
     (maxx, maxy) = display.shape
 
-    # create a field to cover all pixels in the screen
-    field = [0.0] * screen.pixels
-
     # create a timewarp
     timewarp = TimeWarp(lambda: timebase.seconds())
 
@@ -69,27 +66,19 @@ def frames(layer):
         decay = layer.variable_manager.variables["decay"].value
 
         # generate the scalar field
-        for info in display.pixel_info():
-            idx, coordinates, position = info
-            x, y = position
-            dx, dy = (x - center[0], y - center[1])
-
-            radius = math.sqrt(pow(dx, 2.0) + pow(dy, 2.0))
-
-            field[idx] = (
-                amplitude
-                * (1.0 / (decay * radius + 1.0))
-                * math.sin(frequency * radius)
-                + offset
-            )
+        (radius, _) = display.polar(center)
+        field = (
+            amplitude * (1.0 / (decay * radius + 1.0)) * numpy.sin(frequency * radius)
+            + offset
+        )
 
-        scalar_field = pysicgl.ScalarField(field)
+        field = scalar_field(field)
 
         # show the scalar field
         pysicgl.functional.scalar_field(
             layer.canvas,
             layer.canvas.screen,
-            scalar_field,
+            field,
             layer.palette,
             timewarp.local(),
         )
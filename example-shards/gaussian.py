@@ -1,14 +1,14 @@
+import numpy
 import pysicgl
 from hidden_shades import timebase
 from hidden_shades.timewarp import TimeWarp
 from hidden_shades.variables.responder import VariableResponder
 from hidden_shades.variables.types import FloatingVariable
-from pysicgl_utils import Display
-import math
+from pysicgl_utils import Display, scalar_field
 
 
 def gaussian(x):
-    return 10 * x * math.sin(2 * x / math.pi) / 3.0
+    return 10 * x * numpy.sin(2 * x / numpy.pi) / 3.0
 
 
 def frames(layer):
@@ -39,7 +39,6 @@ def frames(layer):
 
     # prepare a few static variables
     screen = layer.canvas.screen
-    field = [0.0] * screen.pixels
 
     state = {
         "scalar_field": None,
@@ -57,16 +56,12 @@ def frames(layer):
         centerY = layer.variable_manager.variables["centerY"].value
 
         # add a gaussian value to the scalar field
-        for pixel in display.pixel_info():
-            (idx, (u, v), (x, y)) = pixel
-
-            gx = gaussian((((x + centerX) / maxx) * scaleX) - 0.5)
-            gy = gaussian((((y + centerY) / maxy) * scaleY) - 0.5)
-
-            field[idx] = -(gx + gy) * amplitude
+        (x, y) = display.positions
+        gx = gaussian((((x + centerX) / maxx) * scaleX) - 0.5)
+        gy = gaussian((((y + centerY) / maxy) * scaleY) - 0.5)
 
         # create the scalar field
-        state["scalar_field"] = pysicgl.ScalarField(field)
+        state["scalar_field"] = scalar_field(-(gx + gy) * amplitude)
 
         # apply the scalar field to the canvas mapping against the
         # layer color palette
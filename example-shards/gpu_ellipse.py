@@ -23,7 +23,7 @@ def frames(layer):
     source_texture_id, source_texture, source_fbo = gpu_environment["source"]
 
     # Create the shader program
-    prog = window.ctx.program(
+    prog = layer.resources.program(
         vertex_shader="""
             #version 330 core
 
@@ -72,14 +72,12 @@ def frames(layer):
     # Create palette texture and bind it to the fragment shader
     color_sample_points = list(np.linspace(0, 1, NUM_COLORS, endpoint=False))
     colorbytes = bytearray(NUM_COLORS * 4)
-    color_texture = window.ctx.texture((NUM_COLORS, 1), 4, colorbytes)
+    color_texture = layer.resources.texture((NUM_COLORS, 1), 4, colorbytes)
     color_texture.use(location=5)
     prog["palette"].value = 5
 
-    # Create a vertex array object as a render target
-    vertices = np.array([-1.0, -1.0, -1.0, 1.0, 1.0, -1.0, 1.0, 1.0])
-    vbo = window.ctx.buffer(vertices.astype("f4"))
-    vao = window.ctx.simple_vertex_array(prog, vbo, "in_vert")
+    # Draw the shared full screen quad as a render target
+    vao = layer.resources.quad(prog)
 
     # a callback function to handle changes to declared variables
     def handle_variable_changes(variable):
@@ -13,7 +13,7 @@ def frames(layer):
 
     window = layer.window
     gpu_environment = layer.gpu_environment
-    prog = window.ctx.program(
+    prog = layer.resources.program(
         vertex_shader="""
             #version 330
 
@@ -66,13 +66,11 @@ def frames(layer):
     # Create texture and bind it to the fragment shader
     color_sample_points = list(np.linspace(0, 1, NUM_COLORS, endpoint=False))
     colorbytes = bytearray(NUM_COLORS * 4)
-    color_texture = window.ctx.texture((NUM_COLORS, 1), 4, colorbytes)
+    color_texture = layer.resources.texture((NUM_COLORS, 1), 4, colorbytes)
     color_texture.use(location=5)
     prog["Texture"].value = 5
 
-    vertices = np.array([-1.0, -1.0, -1.0, 1.0, 1.0, -1.0, 1.0, 1.0])
-    vbo = window.ctx.buffer(vertices.astype("f4"))
-    vao = window.ctx.simple_vertex_array(prog, vbo, "in_vert")
+    vao = layer.resources.quad(prog)
 
     # declare variables
     # these are all of the floating point variety but there are a
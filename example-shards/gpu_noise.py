@@ -40,8 +40,11 @@ def frames(layer):
                 num_colors = 1
 
             # Create palette texture and bind it to the fragment shader
+            # (replacing the texture for the previous resolution)
+            if state["color_texture"] is not None:
+                layer.resources.release(state["color_texture"])
             colorbytes = bytearray(num_colors * 4)
-            color_texture = window.ctx.texture((num_colors, 1), 4, colorbytes)
+            color_texture = layer.resources.texture((num_colors, 1), 4, colorbytes)
             color_texture.use(location=5)
             state["color_bytes"] = colorbytes
             state["color_texture"] = color_texture
@@ -88,7 +91,7 @@ def frames(layer):
     layer.variable_manager.initialize_variables()
 
     # Create the shader program
-    prog = window.ctx.program(
+    prog = layer.resources.program(
         vertex_shader="""
             #version 330 core
 
@@ -228,10 +231,8 @@ def frames(layer):
         """,
     )
 
-    # Create a vertex array object as a render target
-    vertices = np.array([-1.0, -1.0, -1.0, 1.0, 1.0, -1.0, 1.0, 1.0])
-    vbo = window.ctx.buffer(vertices.astype("f4"))
-    vao = window.ctx.simple_vertex_array(prog, vbo, "in_vert")
+    # Draw the shared full screen quad as a render target
+    vao = layer.resources.quad(prog)
 
     # Bind the palette texture to the fragment shader
     # (the other half of this bind is done in the palette_resolution variable handler)
@@ -1,5 +1,4 @@
 import pysicgl
-import numpy as np
 
 
 def frames(layer):
@@ -13,7 +12,7 @@ def frames(layer):
     source_texture_id, source_texture, source_fbo = gpu_environment["source"]
 
     # Create the shader program
-    prog = window.ctx.program(
+    prog = layer.resources.program(
         vertex_shader="""
             #version 330 core
 
@@ -25,6 +24,7 @@ def frames(layer):
         fragment_shader="""
             #version 330 core
 
+            uniform vec4 color;
             out vec4 f_color;
             void main() {
                 f_color = color;
@@ -32,23 +32,22 @@ def frames(layer):
         """,
     )
 
-    # Create a vertex array object as a render target
-    vertices = np.array([-1.0, -1.0, -1.0, 1.0, 1.0, -1.0, 1.0, 1.0])
-    vbo = window.ctx.buffer(vertices.astype("f4"))
-    vao = window.ctx.simple_vertex_array(prog, vbo, "in_vert")
+    # Draw the shared full screen quad as a render target
+    vao = layer.resources.quad(prog)
 
     while True:
-        yield None
+        # the output only depends on the palette so it may be cached
+        yield layer.FRAME_STATIC
 
         # fill the color texture from the layer palette
         color = pysicgl.functional.interpolate_color_sequence(layer.palette, 0)
 
         # set the uniforms
         prog["color"].value = (
-            (color >> 16) & 0xFF,
-            (color >> 8) & 0xFF,
-            (color >> 0) & 0xFF,
-            (color >> 24) & 0xFF,
+            ((color >> 16) & 0xFF) / 255,
+            ((color >> 8) & 0xFF) / 255,
+            ((color >> 0) & 0xFF) / 255,
+            ((color >> 24) & 0xFF) / 255,
         )
 
         # use the source texture to render
@@ -1,7 +1,7 @@
 import pysicgl
 import numpy
 import opensimplex
-from pysicgl_utils import Display
+from pysicgl_utils import Display, scalar_field
 from hidden_shades import timebase
 from hidden_shades.timewarp import TimeWarp
 from hidden_shades.variables.responder import VariableResponder
@@ -39,8 +39,6 @@ def frames(layer):
     # prepare a few static variables
     screen = layer.canvas.screen
     display = Display(screen)
-    field = [0.0] * screen.pixels
-    print(len(field))
 
     # use the TimeWarp class to make an offset from the base time
     # this begins at unity speed (1.0) but will be updated by the
@@ -80,14 +78,8 @@ def frames(layer):
 
         # print(out.size)
 
-        # This loop is evidence of the need for pysicgl to support
-        # numpy arrays in the constructor for ScalarField objects
-        (nx, ny) = display.extent
-        for idx in range(nx):
-            for idy in range(ny):
-                field[idx + idy * nx] = float(out[0][idy][idx])
-
-        state["scalar_field"] = pysicgl.ScalarField(field)
+        # the noise is indexed [z][y][x] which is already in pixel order
+        state["scalar_field"] = scalar_field(out[0])
 
     # a callback function to handle changes to declared variables
     def handle_variable_changes(variable):
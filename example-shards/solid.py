@@ -4,6 +4,7 @@ import pysicgl
 
 def frames(layer):
     while True:
-        yield None
+        # the output only depends on the palette so it may be cached
+        yield layer.FRAME_STATIC
 
         pysicgl.functional.interface_fill(layer.canvas, layer.palette[0])
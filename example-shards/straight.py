@@ -1,5 +1,5 @@
 import pysicgl
-from pysicgl_utils import Display
+from pysicgl_utils import Display, scalar_field
 from hidden_shades import timebase
 from hidden_shades.timewarp import TimeWarp
 from hidden_shades.variables.responder import VariableResponder
@@ -10,7 +10,6 @@ def frames(layer):
     screen = layer.canvas.screen
     display = Display(screen)
     timewarp = TimeWarp(lambda: timebase.seconds())
-    field = [0.0] * screen.pixels
 
     state = {
         "scalar_field": None,
@@ -39,13 +38,8 @@ def frames(layer):
             sx, sy = (0, -1)
 
         # use the scale and direction signs to compute a scalar field
-        for info in display.pixel_info():
-            idx, coordinates, position = info
-            x, y = position
-
-            field[idx] = scale * (sx * x + sy * y)
-
-        state["scalar_field"] = pysicgl.ScalarField(field)
+        x, y = display.positions
+        state["scalar_field"] = scalar_field(scale * (sx * x + sy * y))
 
     # a callback function to handle changes to declared variables
     def handle_variable_changes(variable):
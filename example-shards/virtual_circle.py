@@ -1,5 +1,6 @@
+import numpy
 import pysicgl
-from pysicgl_utils import Display
+from pysicgl_utils import Display, scalar_field
 from hidden_shades import timebase
 from hidden_shades.timewarp import TimeWarp
 from hidden_shades.variables.responder import VariableResponder
@@ -59,7 +60,6 @@ def frames(layer):
     display = Display(screen)
     timewarp = TimeWarp(lambda: timebase.seconds())
     (maxx, maxy) = display.shape
-    field = [0.0] * screen.pixels
 
     state = {
         "scalar_field": None,
@@ -81,21 +81,12 @@ def frames(layer):
         lx, ly = (location[0], location[1])
 
         # use the scale and direction signs to compute a scalar field
-        for info in display.pixel_info():
-            idx, coordinates, position = info
-            x, y = position
+        (r, _) = display.polar((lx, ly))
 
-            r = math.sqrt(math.pow(x - lx, 2) + math.pow(y - ly, 2))
+        dist = abs(r - diameter)
+        field = numpy.where(dist < 0.1, dist * 10, numpy.where(r < diameter, 1.0, 0.0))
 
-            dist = abs(r - diameter)
-            if dist < 0.1:
-                field[idx] = dist * 10
-            elif r < diameter:
-                field[idx] = float(1)
-            else:
-                field[idx] = float(0)
-
-        state["scalar_field"] = pysicgl.ScalarField(field)
+        state["scalar_field"] = scalar_field(field)
 
     def add_wobble():
         # adds a little noise into the direction vector
@@ -3,7 +3,9 @@ from semver import SemanticVersion
 
 from .shards import shards_app, init_shards_app
 from .output import output_app, init_output_app
-from .globals import globals_app
+from .globals import globals_app, init_globals_app
+from .drivers import drivers_app, init_drivers_app
+from .metrics import metrics_app, init_metrics_app
 from .audio import audio_app
 
 api_version = SemanticVersion.from_semver("0.0.0")
@@ -19,14 +21,21 @@ def init_api_app(
     globals,
     window,
     gpu_environment,
+    outputs,
+    metrics,
 ):
     # a sorta ugly way to pass local data into the stacks app...
     init_output_app(
         stack_manager, canvas, layer_post_init_hook, globals, window, gpu_environment
     )
     init_shards_app(shards_source_dir)
+    init_globals_app(globals)
+    init_drivers_app(outputs)
+    init_metrics_app(metrics, stack_manager, outputs)
 
     api_app.mount(shards_app, url_prefix="/shards")
     api_app.mount(output_app, url_prefix="/output")
     api_app.mount(globals_app, url_prefix="/global")
     api_app.mount(audio_app, url_prefix="/audio")
+    api_app.mount(drivers_app, url_prefix="/drivers")
+    api_app.mount(metrics_app, url_prefix="/metrics")
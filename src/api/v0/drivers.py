@@ -0,0 +1,16 @@
+from microdot_asyncio import Microdot
+
+drivers_app = Microdot()
+
+
+def init_drivers_app(outputs):
+    @drivers_app.get("")
+    async def get_drivers(request):
+        return {
+            "healthy": all(output.healthy for output in outputs),
+            "drivers": [output.stats for output in outputs],
+        }
+
+    @drivers_app.get("/<int:index>")
+    async def get_driver(request, index):
+        return outputs[index].stats
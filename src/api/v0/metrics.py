@@ -0,0 +1,32 @@
+from microdot_asyncio import Microdot
+
+metrics_app = Microdot()
+
+
+def init_metrics_app(metrics, stack_manager, outputs):
+    def layer_metrics(layer):
+        return {
+            "id": layer.id,
+            "shard_uuid": layer.info.get("shard_uuid"),
+            "active": layer.active,
+            "cached": layer.cached,
+            "timings": layer.metrics.stats,
+        }
+
+    @metrics_app.get("")
+    async def get_metrics(request):
+        return {
+            "stages": metrics.stats,
+            "layers": [layer_metrics(layer) for layer in stack_manager.active],
+            "drivers": [
+                {"name": output.name, "push": output.stats["send_ms"]}
+                for output in outputs
+            ],
+        }
+
+    @metrics_app.delete("")
+    async def delete_metrics(request):
+        metrics.reset()
+        for layer in stack_manager.active:
+            layer.metrics.reset()
+        return None
@@ -1,3 +1,6 @@
+ARTNET_PROTOCOL_VERSION = 14
+
+
 class ArtDMXPacket:
     def __init__(self, physical_port=0):
         self._buffer = bytearray(18 + 512)
@@ -5,7 +8,7 @@ class ArtDMXPacket:
 
         self.header = bytearray("Art-Net\0", "utf-8")
         self.opcode = 0x5000
-        self.protocol_version = 0x00014
+        self.protocol_version = ARTNET_PROTOCOL_VERSION
         self.physical_port = physical_port
 
         self._length = 0
@@ -96,6 +99,22 @@ class ArtDMXPacket:
 
     @data.setter
     def data(self, val):
-        for i in range(len(val)):
-            self._buffer[18 + i] = val[i]
-        self.length = len(val)
+        length = len(val)
+        self._buffer[18 : 18 + length] = val
+        self.length = length
+
+
+class ArtSyncPacket:
+    """
+    Tells nodes to output the DMX data they have received since the last sync.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray(14)
+        self._buffer[0:8] = b"Art-Net\0"
+        self._buffer[8:10] = (0x5200).to_bytes(2, "little")
+        self._buffer[10:12] = ARTNET_PROTOCOL_VERSION.to_bytes(2, "big")
+
+    @property
+    def buffer(self):
+        return self._buffer
@@ -1,29 +1,215 @@
+import numpy
+from functools import lru_cache
+
+
+class FloatBuffer:
+    """
+    A fixed length buffer of 32 bit floating point values.
+
+    Keyword Arguments:
+        array: numpy.ndarray - existing storage to wrap instead of allocating
+
+    Notes:
+        References returned by reference() share storage with the buffer they
+        were made from, so they always see the latest values.
+    """
+
+    def __init__(self, n, array=None):
+        if array is None:
+            array = numpy.zeros(n, dtype=numpy.float32)
+        self._array = array
+
+    def __len__(self):
+        return len(self._array)
+
+    def __getitem__(self, key):
+        return self._array[key]
+
+    def __setitem__(self, key, value):
+        self._array[key] = value
+
+    def __iter__(self):
+        return iter(self._array)
+
+    def reference(self, window=None):
+        """
+        Returns a buffer which shares storage with this one.
+
+        Keyword Arguments:
+            window: tuple - (min_bin, max_bin) range of elements to include
+        """
+        if window is None:
+            return FloatBuffer(len(self), self._array)
+
+        min_bin, max_bin = window
+        return FloatBuffer(None, self._array[min_bin:max_bin])
+
+    def scale(self, factor):
+        """
+        Multiplies all elements by a factor in place.
+        """
+        numpy.multiply(self._array, factor, out=self._array)
+
+    @property
+    def array(self):
+        return self._array
+
+
+@lru_cache(maxsize=8)
+def _window_function(n):
+    # the hann window tapers both ends of the block to zero which limits
+    # leakage from the discontinuity between consecutive blocks
+    window = numpy.hanning(n).astype(numpy.float32)
+    window.flags.writeable = False
+    return window
+
+
 class FftPlan:
+    """
+    Computes the magnitude spectrum of an input buffer into an output buffer.
+
+    The output holds len(input) // 2 bins, where bin k is centered on the
+    frequency k * sample_frequency / len(input). Magnitudes are normalized so
+    that a full scale sine wave produces a peak of 1.0.
+
+    All intermediate storage except the complex spectrum produced by numpy
+    is allocated once when the plan is created.
+    """
+
     def __init__(self, buffers, sample_frequency):
         input_buffer, output_buffer = buffers
         self._input_buffer = input_buffer
         self._output_buffer = output_buffer
         self._sample_frequency = sample_frequency
 
+        n = len(input_buffer)
+        self._bins = min(len(output_buffer), n // 2)
+        self._window = _window_function(n)
+        self._windowed = numpy.zeros(n, dtype=numpy.float32)
+        self._use_window = False
 
-class FloatBuffer:
-    def __init__(self, n):
-        self._n = n
+        self._normalization = {
+            False: 2 / n,
+            True: 2 / float(numpy.sum(self._window)) if n > 1 else 1.0,
+        }
 
-    def __len__(self):
-        return self._n
+    def window(self):
+        """
+        Applies the window function to the next execution.
+        The input buffer is left unchanged.
+        """
+        numpy.multiply(self._input_buffer.array, self._window, out=self._windowed)
+        self._use_window = True
 
-    def reference(self, window=None):
-        if window is not None:
-            min_bin, max_bin = window
-        return self
+    def execute(self):
+        source = self._input_buffer.array
+        if self._use_window:
+            source = self._windowed
+
+        spectrum = numpy.fft.rfft(source)
+        output = self._output_buffer.array[: self._bins]
+        numpy.abs(spectrum[: self._bins], out=output, casting="unsafe")
+        numpy.multiply(output, self._normalization[self._use_window], out=output)
+
+        self._use_window = False
+
+    def bin_frequency(self, index):
+        """
+        Returns the center frequency of an output bin in Hz.
+        """
+        return index * self._sample_frequency / len(self._input_buffer)
+
+    @property
+    def sample_frequency(self):
+        return self._sample_frequency
+
+
+def bin_stats(buffer):
+    """
+    Returns a tuple (minimum, maximum, mean) of the values in a buffer.
+    """
+    array = buffer.array
+    if len(array) == 0:
+        return (0.0, 0.0, 0.0)
+    return (float(array.min()), float(array.max()), float(array.mean()))
+
+
+def _bins_available(factor, n):
+    # output bin j covers input bins [j ** factor, (j + 1) ** factor)
+    # (the small offset keeps exact powers from rounding down)
+    return int(n ** (1 / factor) + 1e-9)
+
+
+class _ReshapeTable:
+    """
+    Precomputed sampling of a nonlinear bin mapping along with scratch space.
+
+    Each output bin averages the input spectrum over an interval whose edges
+    grow as a power of the output index. The average is found from a running
+    sum of the input, evaluated at the edges by interpolation, so no per call
+    loops are needed.
+    """
 
+    def __init__(self, factor, n_in, n_out):
+        self.bins = min(_bins_available(factor, n_in), n_out)
 
-def bin_stats():
-    pass
+        edges = numpy.arange(self.bins + 1, dtype=numpy.float64) ** factor
+        edges = numpy.minimum(edges, n_in)
+        self.index = numpy.minimum(edges.astype(numpy.intp), n_in - 1)
+        self.weight = (edges - self.index).astype(numpy.float32)
+        self.inverse_width = (1 / numpy.maximum(numpy.diff(edges), 1e-9)).astype(
+            numpy.float32
+        )
+
+        self.running_sum = numpy.zeros(n_in + 1, dtype=numpy.float32)
+        self.at_edges = numpy.zeros(self.bins + 1, dtype=numpy.float32)
+        self.partial = numpy.zeros(self.bins + 1, dtype=numpy.float32)
+
+
+@lru_cache(maxsize=8)
+def _reshape_table(factor, n_in, n_out):
+    return _ReshapeTable(factor, n_in, n_out)
 
 
 def reshape(config, input, output=None):
+    """
+    Maps linearly spaced fft bins onto nonlinearly spaced bins.
+
+    With a factor greater than one the high frequency bins are merged so
+    that the output is closer to how pitch is perceived. Values below the
+    floor are removed and the rest are shifted down by the floor.
+
+    Returns the number of output bins which hold data when output is None,
+    otherwise fills output in place and returns None. Output bins beyond
+    the available bins are set to zero.
+
+    Keyword Arguments:
+        config: tuple - (factor, floor)
+    """
+    factor, floor = config
+    n_in = len(input)
+
     if output is None:
-        return 1
-    return None
+        return _bins_available(factor, n_in)
+
+    out = output.array
+    table = _reshape_table(float(factor), n_in, len(out))
+    values = input.array
+    bins = table.bins
+
+    # running_sum[k] holds the sum of the first k input bins
+    numpy.cumsum(values, out=table.running_sum[1:])
+
+    # integrate the input up to each edge, interpolating within the edge bin
+    numpy.take(table.running_sum, table.index, out=table.at_edges)
+    numpy.take(values, table.index, out=table.partial)
+    numpy.multiply(table.partial, table.weight, out=table.partial)
+    numpy.add(table.at_edges, table.partial, out=table.at_edges)
+
+    # the mean over each interval is its integral divided by its width
+    numpy.subtract(table.at_edges[1:], table.at_edges[:-1], out=out[:bins])
+    numpy.multiply(out[:bins], table.inverse_width, out=out[:bins])
+    out[bins:] = 0
+
+    numpy.subtract(out, floor, out=out)
+    numpy.maximum(out, 0, out=out)
@@ -0,0 +1,144 @@
+import numpy
+
+
+class SampleRing:
+    """
+    A circular buffer which decodes raw audio packets into float samples and
+    hands out fixed length blocks of the most recent samples.
+
+    Packets are decoded in one step with numpy.frombuffer and scaled into
+    the ring, so there is no per sample work in Python. The ring is stored
+    twice back to back, which means that any block is a contiguous view
+    regardless of where the write position is.
+
+    Blocks become ready every hop samples. A hop shorter than the block
+    length gives overlapping blocks and therefore more frequent spectra.
+
+    Keyword Arguments:
+        hop: int - new samples required between blocks (defaults to the block length)
+        capacity: int - samples held by the ring (defaults to four blocks)
+        sample_format: str - numpy dtype of the incoming samples
+        scale: float - factor applied to decoded samples (defaults to
+            normalizing the full range of integer formats to [-1, 1))
+
+    Notes:
+        Blocks are views into the ring. They remain valid until the ring has
+        received another capacity - block_length samples. Consumers which
+        modify samples must copy them first.
+    """
+
+    def __init__(
+        self, block_length, hop=None, capacity=None, sample_format="<i2", scale=None
+    ):
+        if hop is None:
+            hop = block_length
+        if capacity is None:
+            capacity = 4 * block_length
+        if not (0 < hop <= block_length <= capacity):
+            raise ValueError("invalid ring configuration")
+
+        self._dtype = numpy.dtype(sample_format)
+        if scale is None:
+            scale = 1.0
+            if self._dtype.kind == "i":
+                scale = 1 / (1 << (8 * self._dtype.itemsize - 1))
+        self._scale = scale
+
+        self._block_length = block_length
+        self._hop = hop
+        self._capacity = capacity
+        self._samples = numpy.zeros(2 * capacity, dtype=numpy.float32)
+
+        # bytes of a sample split across packets
+        self._partial = bytearray()
+
+        self._position = 0
+        self._total = 0
+        self._pending = 0
+        self._dropped = 0
+
+    def write(self, data):
+        """
+        Decodes a packet of raw samples into the ring.
+        Returns the number of samples written.
+        """
+        itemsize = self._dtype.itemsize
+        if len(self._partial):
+            data = self._partial + data
+            self._partial = bytearray()
+
+        count = len(data) // itemsize
+        remainder = len(data) - count * itemsize
+        if remainder:
+            self._partial = bytearray(data[count * itemsize :])
+        if count == 0:
+            return 0
+
+        samples = numpy.frombuffer(data, dtype=self._dtype, count=count)
+
+        # only the most recent capacity samples can be kept
+        if count > self._capacity:
+            samples = samples[count - self._capacity :]
+
+        written = len(samples)
+        start = self._position
+        first = min(written, self._capacity - start)
+        self._store(start, samples[:first])
+        self._store(0, samples[first:])
+
+        self._position = (start + written) % self._capacity
+        self._total += count
+        self._pending += count
+        return count
+
+    def _store(self, start, samples):
+        n = len(samples)
+        if n == 0:
+            return
+        ring = self._samples
+        capacity = self._capacity
+        numpy.multiply(samples, self._scale, out=ring[start : start + n])
+        ring[capacity + start : capacity + start + n] = ring[start : start + n]
+
+    @property
+    def ready(self):
+        """
+        Whether a new block is available.
+        """
+        return self._pending >= self._hop and self._total >= self._block_length
+
+    def read(self):
+        """
+        Returns a view of the most recent block of samples.
+        Older blocks which were not read are skipped.
+        """
+        # samples which arrived since the last read but are not part of
+        # this block will never be seen by the consumer
+        if self._pending > self._block_length:
+            self._dropped += self._pending - self._block_length
+        self._pending = 0
+        end = self._position + self._capacity
+        return self._samples[end - self._block_length : end]
+
+    @property
+    def sample_size(self):
+        """
+        Number of bytes in each incoming sample.
+        """
+        return self._dtype.itemsize
+
+    @property
+    def block_length(self):
+        return self._block_length
+
+    @property
+    def hop(self):
+        return self._hop
+
+    @property
+    def total(self):
+        return self._total
+
+    @property
+    def dropped(self):
+        return self._dropped
@@ -0,0 +1,246 @@
+import time
+import asyncio
+import numpy
+from collections import deque
+from audio.ring import SampleRing
+from hidden_shades.audio.source import ManagedAudioSource
+
+TRANSPORT_TCP = "tcp"
+TRANSPORT_UDP = "udp"
+
+transports = (
+    TRANSPORT_TCP,
+    TRANSPORT_UDP,
+)
+
+
+class _StreamProtocol(asyncio.BufferedProtocol):
+    """
+    Receives a TCP stream directly into the receive buffer of a source.
+    """
+
+    def __init__(self, source, closed):
+        self._source = source
+        self._closed = closed
+
+    def get_buffer(self, sizehint):
+        return self._source._receive_view
+
+    def buffer_updated(self, nbytes):
+        self._source.ingest(self._source._receive_view[:nbytes])
+
+    def eof_received(self):
+        # close the transport, the connection will be retried
+        return False
+
+    def connection_lost(self, exc):
+        if not self._closed.done():
+            self._closed.set_result(exc)
+
+
+class _DatagramProtocol(asyncio.DatagramProtocol):
+    """
+    Receives UDP datagrams for a source.
+    """
+
+    def __init__(self, source, closed):
+        self._source = source
+        self._closed = closed
+
+    def datagram_received(self, data, addr):
+        self._source.ingest(data)
+
+    def error_received(self, exc):
+        print(f"audio source {self._source.name} receive error: {exc}")
+
+    def connection_lost(self, exc):
+        if not self._closed.done():
+            self._closed.set_result(exc)
+
+
+class StreamAudioSource(ManagedAudioSource):
+    """
+    An audio source which receives raw samples from the network.
+
+    Data is handled by asyncio protocols as soon as it arrives, so the event
+    loop never waits on the socket. Received data is decoded into a
+    SampleRing and each ready block is processed by the fft. Subclasses
+    select the sample format.
+
+    With the tcp transport the source connects to (host, port) and receives
+    the stream straight into a preallocated buffer. When the connection
+    fails, closes or stalls it is retried with exponential backoff. With the
+    udp transport the source listens for datagrams on (host, port).
+
+    Keyword Arguments:
+        hop: int - new samples between fft blocks (defaults to the block length)
+        transport: str - "tcp" or "udp"
+
+    Notes:
+        Samples are processed synchronously when they arrive. A sender which
+        outpaces the processing fills the socket buffers and is slowed down by
+        tcp flow control. Blocks which are superseded before they could be
+        processed are dropped by the ring.
+    """
+
+    SAMPLE_FORMAT = "<i2"
+
+    BACKOFF_MIN = 0.5
+    BACKOFF_MAX = 10.0
+    STALL_TIMEOUT = 5.0
+
+    def __init__(
+        self,
+        path,
+        name,
+        network_config,
+        audio_config,
+        hop=None,
+        transport=TRANSPORT_TCP,
+        history=100,
+    ):
+        super().__init__(path, name, audio_config)
+
+        if transport not in transports:
+            raise ValueError(f"invalid audio transport {transport}")
+        self._transport = transport
+
+        # break out network config
+        self._host, self._port = network_config
+
+        # decode incoming data into a ring which holds a few blocks of samples
+        self._ring = SampleRing(
+            self._sample_length, hop=hop, sample_format=self.SAMPLE_FORMAT
+        )
+
+        # create a buffer to receive data from the socket connection
+        # (a few blocks so that a backlog is consumed in one step)
+        bytes_per_sample = self._ring.sample_size
+        self._receive_buffer = bytearray(4 * bytes_per_sample * self._sample_length)
+        self._receive_view = memoryview(self._receive_buffer)
+
+        # statistics
+        self._connected = False
+        self._reconnects = 0
+        self._packets = 0
+        self._bytes = 0
+        self._blocks = 0
+        self._last_arrival = None
+        self._arrival_gaps = deque((), history)
+        self._processing_times = deque((), history)
+
+    def ingest(self, data):
+        """
+        Adds received data to the ring and processes the newest block when
+        one is ready.
+        """
+        now = time.monotonic()
+        if self._last_arrival is not None:
+            self._arrival_gaps.append(now - self._last_arrival)
+        self._last_arrival = now
+        self._packets += 1
+        self._bytes += len(data)
+
+        self._ring.write(data)
+        if not self._ring.ready:
+            return
+
+        # the block is copied because the volume is applied in place and
+        # blocks overlap when the hop is shorter than the block length
+        numpy.copyto(self._buffer.array, self._ring.read())
+        self.apply_volume()
+        self.fft.compute()
+        self.fft_postprocess()
+
+        self._blocks += 1
+        self._processing_times.append(time.monotonic() - now)
+
+    async def run(self):
+        backoff = self.BACKOFF_MIN
+
+        while True:
+            packets = self._packets
+            try:
+                await self._receive()
+            except (OSError, asyncio.TimeoutError) as e:
+                print(f"audio source {self.name}: {e}")
+
+            # the connection worked for a while, so start over with short delays
+            if self._packets > packets:
+                backoff = self.BACKOFF_MIN
+
+            print(f"audio source {self.name}: retrying in {backoff} seconds")
+            await asyncio.sleep(backoff)
+            backoff = min(2 * backoff, self.BACKOFF_MAX)
+            self._reconnects += 1
+
+    async def _receive(self):
+        loop = asyncio.get_running_loop()
+        closed = loop.create_future()
+        address = (self._host, int(self._port))
+
+        if self._transport == TRANSPORT_UDP:
+            transport, _ = await loop.create_datagram_endpoint(
+                lambda: _DatagramProtocol(self, closed), local_addr=address
+            )
+        else:
+            transport, _ = await loop.create_connection(
+                lambda: _StreamProtocol(self, closed), *address
+            )
+
+        self._connected = True
+        connected_at = time.monotonic()
+        try:
+            while not closed.done():
+                try:
+                    await asyncio.wait_for(asyncio.shield(closed), 1.0)
+                except asyncio.TimeoutError:
+                    pass
+
+                # a stream which stops delivering data is reconnected
+                # (datagrams may legitimately pause so udp keeps listening)
+                if self._transport == TRANSPORT_TCP:
+                    last = self._last_arrival
+                    if last is None or last < connected_at:
+                        last = connected_at
+                    if time.monotonic() - last > self.STALL_TIMEOUT:
+                        raise asyncio.TimeoutError("stream stalled")
+
+            exc = closed.result()
+            if exc is not None:
+                raise exc
+            raise ConnectionError("connection closed")
+        finally:
+            self._connected = False
+            transport.close()
+
+    @property
+    def ring(self):
+        return self._ring
+
+    @property
+    def stats(self):
+        def summary(values):
+            if len(values) == 0:
+                return {"mean": 0.0, "max": 0.0}
+            return {
+                "mean": 1000 * sum(values) / len(values),
+                "max": 1000 * max(values),
+            }
+
+        age_ms = None
+        if self._last_arrival is not None:
+            age_ms = 1000 * (time.monotonic() - self._last_arrival)
+
+        return {
+            "transport": self._transport,
+            "connected": self._connected,
+            "reconnects": self._reconnects,
+            "packets": self._packets,
+            "bytes": self._bytes,
+            "blocks": self._blocks,
+            "dropped_samples": self._ring.dropped,
+            "age_ms": age_ms,
+            "arrival_gap_ms": summary(self._arrival_gaps),
+            "processing_ms": summary(self._processing_times),
+        }
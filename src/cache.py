@@ -1,11 +1,14 @@
 import json
-from pathutils import ensure_parent_dirs
+from persistence import writer
 
 
 class Cache:
     """
     Cache storage backed by filesystem.
     Nested dictionaries not allowed.
+
+    Changes are stored through the shared write-behind writer, so several
+    changes in quick succession result in a single write.
     """
 
     def __init__(self, path, initial_values={}, on_change=None):
@@ -14,11 +17,10 @@ class Cache:
         self._cache = initial_values
 
         # try to load existing file
-        # if failed then make sure dirs exist for initial storage
+        # (the store creates any directories it needs for initial storage)
         try:
             self.load()
         except FileNotFoundError:
-            ensure_parent_dirs(path)
             self.notify()
 
         # store initial values
@@ -46,13 +48,14 @@ class Cache:
                         self._cache[key] = corrected
 
     def load(self):
-        with open(self._path, "r") as f:
-            self._cache = json.load(f)
+        # stored values take precedence over the initial values, but keys
+        # which were added after the file was written keep their defaults
+        stored = json.loads(writer.read(self._path))
+        self._cache = {**self._cache, **stored}
         self.notify()
 
     def store(self):
-        with open(self._path, "w") as f:
-            json.dump(self._cache, f)
+        writer.write(self._path, json.dumps(self._cache))
 
     def get(self, name):
         return self._cache[name]
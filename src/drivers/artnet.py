@@ -1,49 +1,197 @@
-from artnet import ArtDMXPacket
+from artnet import ArtDMXPacket, ArtSyncPacket
 import socket
 
 MAX_BYTES_PER_UNIVERSE = 512
+ARTDMX_HEADER_LENGTH = 18
+
+
+def contiguous_layout(total_channels, start_universe=0, channels_per_universe=None):
+    """
+    Returns a layout which fills consecutive universes with the frame data.
+
+    Keyword Arguments:
+        start_universe: int - universe which receives the start of the frame
+        channels_per_universe: int - channels used in each universe, e.g. 510
+            to keep RGB pixels from being split across universes
+    """
+    if channels_per_universe is None:
+        channels_per_universe = MAX_BYTES_PER_UNIVERSE
+    if not (0 < channels_per_universe <= MAX_BYTES_PER_UNIVERSE):
+        raise ValueError("invalid number of channels per universe")
+
+    layout = []
+    offset = 0
+    universe = start_universe
+    while offset < total_channels:
+        length = min(channels_per_universe, total_channels - offset)
+        layout.append((universe, 0, offset, length))
+        offset += length
+        universe += 1
+    return tuple(layout)
 
 
 class ArtnetDriver:
-    def __init__(self, host, port=6454, start_universe=0, physical_port=0):
-        self._packet = ArtDMXPacket(physical_port)
+    """
+    Sends frames to an Art-Net node.
+
+    One packet is built per universe when the layout is known and is reused
+    for every frame, so pushing a frame only copies slices of the frame into
+    the packet payloads and sends them. The socket is connected to the node
+    and does not block, so a full send buffer drops packets instead of
+    stalling the render loop.
+
+    Failed sends raise OSError, including ConnectionRefusedError when the
+    node is not listening (reported on connected sockets). reconnect()
+    resolves the node again and opens a new socket.
+
+    A layout is a sequence of segments (universe, channel, offset, length),
+    each of which copies length bytes starting at offset in the frame to the
+    universe starting at channel. Several segments may share a universe.
 
-        self._disabled = False
+    Keyword Arguments:
+        start_universe: int - first universe of the default contiguous layout
+        physical_port: int - physical port reported in each packet
+        layout: tuple - segments to output (defaults to a contiguous layout
+            covering the whole frame)
+        channels_per_universe: int - channels used per universe by the
+            default layout
+        sync: bool - send an ArtSync packet after each frame so that nodes
+            update all universes at the same time
 
+    Notes:
+        The standard library has no batched datagram send (sendmmsg), so a
+        frame is one send per universe. Each send is a single call on a
+        prebuilt memoryview without address lookup or copies.
+    """
+
+    def __init__(
+        self,
+        host,
+        port=6454,
+        start_universe=0,
+        physical_port=0,
+        layout=None,
+        channels_per_universe=None,
+        sync=False,
+    ):
         # configure socket
         self._host = host
         self._port = port
-        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self._addr = socket.getaddrinfo(self._host, self._port)[0][-1]
+        self._sock = None
+        self.reconnect()
 
         # configure output
         self._start_universe = start_universe
+        self._physical_port = physical_port
+        self._channels_per_universe = channels_per_universe
+        self._sync = ArtSyncPacket() if sync else None
         self._sequence = 0
-        self.advance_sequence()
+
+        # the default layout depends on the frame size so it is built lazily
+        self._default_layout = layout is None
+        self._frame_length = None
+        self._packets = []
+        self._copies = []
+        self._payloads = []
+        if layout is not None:
+            self._build(layout)
+
+        # statistics
+        self._frames = 0
+        self._dropped = 0
+
+    def reconnect(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+        self._addr = socket.getaddrinfo(self._host, self._port)[0][-1]
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+            sock.connect(self._addr)
+            sock.setblocking(False)
+        except OSError:
+            sock.close()
+            raise
+        self._sock = sock
+
+    def _build(self, layout):
+        # one packet per universe, sized to the highest channel in use
+        packets = {}
+        lengths = {}
+        for universe, channel, offset, length in layout:
+            if channel < 0 or offset < 0 or length <= 0:
+                raise ValueError("invalid layout segment")
+            if channel + length > MAX_BYTES_PER_UNIVERSE:
+                raise ValueError(f"layout exceeds universe {universe}")
+            if universe not in packets:
+                packets[universe] = ArtDMXPacket(self._physical_port)
+                packets[universe].universe = universe
+                lengths[universe] = 0
+            lengths[universe] = max(lengths[universe], channel + length)
+
+        for universe, packet in packets.items():
+            # the dmx length must be even
+            packet.length = lengths[universe] + (lengths[universe] & 1)
+
+        # slices of the frame and the payloads they are copied to
+        self._copies = []
+        for universe, channel, offset, length in layout:
+            start = ARTDMX_HEADER_LENGTH + channel
+            payload = memoryview(packets[universe].buffer)[start : start + length]
+            self._copies.append((offset, offset + length, payload))
+
+        self._packets = list(packets.values())
+        self._payloads = [
+            memoryview(packet.buffer)[: ARTDMX_HEADER_LENGTH + packet.length]
+            for packet in self._packets
+        ]
+        self._frame_length = max(
+            (offset + length for _, _, offset, length in layout), default=0
+        )
 
     def advance_sequence(self):
         self._sequence += 1
         if self._sequence > 255:
             self._sequence = 1
-        self._packet.sequence = self._sequence
-
-    def push(self, interface):
-        if not self._disabled:
-            bytes_remaining = len(interface.memory)
-            offset = 0
-            universes = (bytes_remaining // MAX_BYTES_PER_UNIVERSE) + 1
-
-            for universe in range(universes):
-                length = min(MAX_BYTES_PER_UNIVERSE, bytes_remaining)
-                self._packet.universe = universe
-                self._packet.data = interface.memory[offset : offset + length]
-
-                try:
-                    self._sock.sendto(self._packet.buffer, self._addr)
-                except:
-                    print("ERROR sending ArtNet packet")
-                    self._disabled = True
-
-                self.advance_sequence()
-                offset += length
-                bytes_remaining -= length
+        for packet in self._packets:
+            packet.sequence = self._sequence
+
+    def push(self, data):
+        if self._default_layout and self._frame_length != len(data):
+            self._build(
+                contiguous_layout(
+                    len(data), self._start_universe, self._channels_per_universe
+                )
+            )
+        elif len(data) < self._frame_length:
+            print("ERROR ArtNet frame is smaller than the layout")
+            return
+
+        for start, end, payload in self._copies:
+            payload[:] = data[start:end]
+        self.advance_sequence()
+
+        send = self._sock.send
+        try:
+            for payload in self._payloads:
+                send(payload)
+            if self._sync is not None:
+                send(self._sync.buffer)
+        except BlockingIOError:
+            # a full send buffer only loses this frame
+            self._dropped += 1
+        self._frames += 1
+
+    @property
+    def universes(self):
+        return tuple(packet.universe for packet in self._packets)
+
+    @property
+    def stats(self):
+        return {
+            "frames": self._frames,
+            "dropped": self._dropped,
+            "universes": len(self._packets),
+        }
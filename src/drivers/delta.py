@@ -0,0 +1,227 @@
+import struct
+import numpy
+
+# every packet starts with a header:
+# magic, frame type, sequence, base sequence, frame length
+# a keyframe is followed by the whole frame. a delta is followed by spans
+# of changed bytes, each a span header (offset, length) and the new bytes.
+# a delta applies only to the frame whose sequence is its base.
+MAGIC = b"HSD1"
+HEADER = struct.Struct("<4sBIII")
+SPAN = struct.Struct("<II")
+
+FRAME_KEY = 0
+FRAME_DELTA = 1
+
+SEQUENCE_MASK = 0xFFFFFFFF
+
+
+class DeltaEncoder:
+    """
+    Encodes frames as differences from the previously encoded frame.
+
+    Changed bytes are found with a single comparison against a copy of the
+    previous frame. Nearby changes are merged into spans when the unchanged
+    bytes between them cost less than the header of another span. A
+    keyframe is sent instead when it would be smaller than the delta, when
+    the frame length changes, and every keyframe_interval frames so that a
+    decoder recovers from lost packets.
+
+    Keyword Arguments:
+        keyframe_interval: int - maximum number of frames between keyframes
+
+    Notes:
+        The returned packet refers to memory that is reused by the next call.
+    """
+
+    def __init__(self, keyframe_interval=60):
+        self._keyframe_interval = keyframe_interval
+        self._merge_gap = SPAN.size
+
+        self._previous = None
+        self._buffer = bytearray()
+        self._sequence = 0
+        self._since_keyframe = 0
+
+        # statistics
+        self._keyframes = 0
+        self._deltas = 0
+        self._bytes_in = 0
+        self._bytes_out = 0
+
+    def reset(self):
+        """
+        Makes the next frame a keyframe.
+        """
+        self._previous = None
+
+    def encode(self, data):
+        """
+        Returns a memoryview of the packet which encodes a frame.
+        """
+        frame = numpy.frombuffer(data, dtype=numpy.uint8)
+        length = len(frame)
+        self._sequence = (self._sequence + 1) & SEQUENCE_MASK
+
+        if len(self._buffer) != HEADER.size + length:
+            self._buffer = bytearray(HEADER.size + length)
+
+        size = None
+        if (
+            self._previous is not None
+            and len(self._previous) == length
+            and self._since_keyframe < self._keyframe_interval
+        ):
+            size = self._encode_delta(frame, data)
+
+        if size is None:
+            size = self._encode_keyframe(data, length)
+            self._previous = frame.copy()
+            self._since_keyframe = 0
+            self._keyframes += 1
+        else:
+            numpy.copyto(self._previous, frame)
+            self._since_keyframe += 1
+            self._deltas += 1
+
+        self._bytes_in += length
+        self._bytes_out += size
+        return memoryview(self._buffer)[:size]
+
+    def _encode_keyframe(self, data, length):
+        HEADER.pack_into(
+            self._buffer, 0, MAGIC, FRAME_KEY, self._sequence, self._sequence, length
+        )
+        self._buffer[HEADER.size :] = memoryview(data).cast("B")
+        return HEADER.size + length
+
+    def _encode_delta(self, frame, data):
+        # returns the packet size, or None when a keyframe would be smaller
+        changed = numpy.flatnonzero(frame != self._previous)
+        if len(changed):
+            breaks = numpy.flatnonzero(numpy.diff(changed) > self._merge_gap + 1)
+            starts = changed[numpy.concatenate(([0], breaks + 1))]
+            ends = changed[numpy.concatenate((breaks, [len(changed) - 1]))] + 1
+        else:
+            starts = ends = changed
+
+        size = HEADER.size + SPAN.size * len(starts) + int(numpy.sum(ends - starts))
+        if size >= HEADER.size + len(frame):
+            return None
+
+        buffer = self._buffer
+        source = memoryview(data).cast("B")
+        HEADER.pack_into(
+            buffer,
+            0,
+            MAGIC,
+            FRAME_DELTA,
+            self._sequence,
+            (self._sequence - 1) & SEQUENCE_MASK,
+            len(frame),
+        )
+        position = HEADER.size
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            SPAN.pack_into(buffer, position, start, end - start)
+            position += SPAN.size
+            buffer[position : position + end - start] = source[start:end]
+            position += end - start
+        return position
+
+    @property
+    def stats(self):
+        ratio = None
+        if self._bytes_out:
+            ratio = self._bytes_in / self._bytes_out
+        return {
+            "keyframes": self._keyframes,
+            "deltas": self._deltas,
+            "bytes_in": self._bytes_in,
+            "bytes_out": self._bytes_out,
+            "compression_ratio": ratio,
+        }
+
+
+class DeltaDecoder:
+    """
+    Reference decoder for packets made by DeltaEncoder.
+
+    Deltas whose base is not the current frame, because a packet was lost
+    or reordered, are skipped until the next keyframe.
+    """
+
+    def __init__(self):
+        self._frame = None
+        self._sequence = None
+        self._received = None
+
+        # statistics
+        self._keyframes = 0
+        self._deltas = 0
+        self._skipped = 0
+        self._lost = 0
+
+    def decode(self, packet):
+        """
+        Applies a packet and returns a memoryview of the current frame, or
+        None when the packet could not be applied.
+        Raises ValueError for malformed packets.
+        """
+        packet = memoryview(packet)
+        if len(packet) < HEADER.size:
+            raise ValueError("packet is too short")
+        magic, kind, sequence, base, length = HEADER.unpack_from(packet)
+        if magic != MAGIC:
+            raise ValueError("packet is not part of a delta stream")
+
+        if self._received is not None:
+            self._lost += (sequence - self._received - 1) & SEQUENCE_MASK
+        self._received = sequence
+
+        if kind == FRAME_KEY:
+            if len(packet) != HEADER.size + length:
+                raise ValueError("keyframe length does not match its header")
+            self._frame = bytearray(packet[HEADER.size :])
+            self._sequence = sequence
+            self._keyframes += 1
+            return memoryview(self._frame)
+
+        if kind != FRAME_DELTA:
+            raise ValueError(f"unknown frame type {kind}")
+
+        frame = self._frame
+        if frame is None or base != self._sequence or len(frame) != length:
+            self._skipped += 1
+            return None
+
+        position = HEADER.size
+        while position < len(packet):
+            if position + SPAN.size > len(packet):
+                self._frame = None
+                raise ValueError("truncated span")
+            start, count = SPAN.unpack_from(packet, position)
+            position += SPAN.size
+            if start + count > length or position + count > len(packet):
+                self._frame = None
+                raise ValueError("span exceeds the frame")
+            frame[start : start + count] = packet[position : position + count]
+            position += count
+
+        self._sequence = sequence
+        self._deltas += 1
+        return memoryview(frame)
+
+    @property
+    def frame(self):
+        if self._frame is None:
+            return None
+        return memoryview(self._frame)
+
+    @property
+    def stats(self):
+        return {
+            "keyframes": self._keyframes,
+            "deltas": self._deltas,
+            "skipped": self._skipped,
+            "lost": self._lost,
+        }
@@ -0,0 +1,174 @@
+import time
+import threading
+from profiling import TimingHistory
+
+
+class DriverOutput:
+    """
+    Runs a driver on its own thread, fed through a slot which holds only the
+    latest frame.
+
+    Submitting a frame copies it into the slot and returns immediately. The
+    thread sends whatever frame is in the slot when it is ready, so a driver
+    which cannot keep up skips frames instead of holding up rendering.
+
+    When a push fails the driver is considered unhealthy. The thread waits
+    with exponential backoff, calls driver.reconnect() if the driver has one,
+    and resumes with the latest frame.
+
+    Keyword Arguments:
+        name: str - name used in logs and health reports (defaults to the
+            class name of the driver)
+        history: int - number of send times kept for statistics
+
+    Notes:
+        Drivers report failures by raising from push(). Frames passed to
+        push() are only valid for the duration of the call.
+    """
+
+    BACKOFF_MIN = 0.5
+    BACKOFF_MAX = 10.0
+
+    def __init__(self, driver, name=None, history=100):
+        if name is None:
+            name = type(driver).__name__
+        self._driver = driver
+        self._name = name
+
+        self._condition = threading.Condition()
+        self._slot = bytearray()
+        self._pending = False
+        self._running = False
+        self._thread = None
+
+        # statistics
+        self._submitted = 0
+        self._sent = 0
+        self._replaced = 0
+        self._errors = 0
+        self._reconnects = 0
+        self._healthy = True
+        self._last_error = None
+        self._last_sent = None
+        self._send_times = TimingHistory(history)
+
+    def start(self):
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(
+            target=self._run, name=f"output-{self._name}", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit(self, data):
+        """
+        Copies a frame into the slot, replacing any frame not yet sent.
+        """
+        with self._condition:
+            if len(self._slot) != len(data):
+                self._slot = bytearray(len(data))
+            self._slot[:] = data
+            if self._pending:
+                self._replaced += 1
+            self._pending = True
+            self._submitted += 1
+            self._condition.notify()
+
+    def _run(self):
+        frame = bytearray()
+        while True:
+            with self._condition:
+                while self._running and not self._pending:
+                    self._condition.wait()
+                if not self._running:
+                    return
+
+                # swap buffers so that the next frame can be submitted while
+                # this one is sent
+                self._slot, frame = frame, self._slot
+                self._pending = False
+
+            start = time.monotonic()
+            try:
+                self._driver.push(frame)
+            except Exception as e:
+                self._errors += 1
+                self._healthy = False
+                self._last_error = str(e)
+                print(f"output {self._name}: {e}")
+                self._recover()
+                continue
+
+            now = time.monotonic()
+            self._send_times.record(1000 * (now - start))
+            self._last_sent = now
+            self._sent += 1
+            self._healthy = True
+
+    def _recover(self):
+        reconnect = getattr(self._driver, "reconnect", None)
+        backoff = self.BACKOFF_MIN
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: not self._running, backoff)
+                if not self._running:
+                    return
+
+            if reconnect is None:
+                return
+            try:
+                reconnect()
+                self._reconnects += 1
+                return
+            except Exception as e:
+                self._last_error = str(e)
+                print(f"output {self._name}: reconnect failed: {e}")
+                backoff = min(2 * backoff, self.BACKOFF_MAX)
+
+    @property
+    def driver(self):
+        return self._driver
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def healthy(self):
+        return self._healthy
+
+    @property
+    def stats(self):
+        age_ms = None
+        if self._last_sent is not None:
+            age_ms = 1000 * (time.monotonic() - self._last_sent)
+
+        stats = {
+            "name": self._name,
+            "running": self._running,
+            "healthy": self._healthy,
+            "last_error": self._last_error,
+            "submitted": self._submitted,
+            "sent": self._sent,
+            "replaced": self._replaced,
+            "errors": self._errors,
+            "reconnects": self._reconnects,
+            "age_ms": age_ms,
+            "send_ms": self._send_times.stats,
+        }
+
+        # include statistics reported by the driver itself
+        driver_stats = getattr(self._driver, "stats", None)
+        if driver_stats is not None:
+            stats["driver"] = driver_stats
+        return stats
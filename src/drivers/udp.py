@@ -1,11 +1,62 @@
+import socket
+from drivers.delta import DeltaEncoder
+
+ENCODING_RAW = "raw"
+ENCODING_DELTA = "delta"
+
+encodings = (
+    ENCODING_RAW,
+    ENCODING_DELTA,
+)
+
+
 class UDPDriver:
-    def __init__(self, host="0.0.0.0", ports=(6969, 6420)):
-        import socket
+    """
+    Sends each frame to a host in a single datagram.
+
+    Keyword Arguments:
+        encoding: str - "raw" sends frames as they are, "delta" sends the
+            changes since the previous frame (see drivers.delta)
+        keyframe_interval: int - maximum frames between keyframes when
+            using the delta encoding
+    """
+
+    def __init__(
+        self,
+        host="0.0.0.0",
+        ports=(6969, 6420),
+        encoding=ENCODING_RAW,
+        keyframe_interval=60,
+    ):
+        if encoding not in encodings:
+            raise ValueError(f"invalid udp encoding {encoding}")
 
         self._host = host
         self._port_control, self._port_data = ports
+        self._encoder = None
+        if encoding == ENCODING_DELTA:
+            self._encoder = DeltaEncoder(keyframe_interval)
+
+        self._sock = None
+        self.reconnect()
+
+    def reconnect(self):
+        if self._sock is not None:
+            self._sock.close()
         self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self._addr = socket.getaddrinfo(self._host, self._port_data)[0][-1]
 
-    def push(self, interface):
-        self._sock.sendto(interface.memory, self._addr)
+        # the receiver may have missed frames so start over with a keyframe
+        if self._encoder is not None:
+            self._encoder.reset()
+
+    def push(self, data):
+        if self._encoder is not None:
+            data = self._encoder.encode(data)
+        self._sock.sendto(data, self._addr)
+
+    @property
+    def stats(self):
+        if self._encoder is None:
+            return None
+        return self._encoder.stats
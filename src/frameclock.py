@@ -0,0 +1,124 @@
+import time
+import asyncio
+from collections import deque
+
+POLICY_DROP = "drop"
+POLICY_CATCH_UP = "catch_up"
+POLICY_RESET = "reset"
+
+policies = (
+    POLICY_DROP,
+    POLICY_CATCH_UP,
+    POLICY_RESET,
+)
+
+
+class FrameClock:
+    """
+    Paces a render loop at a target frequency.
+
+    Deadlines are kept on a fixed grid measured with a monotonic clock so that
+    inaccuracies in individual sleeps do not accumulate into drift. The caller
+    sleeps until the deadline rather than spinning so that other tasks (api,
+    audio, artnet) get the processor in the meantime.
+
+    When a frame finishes after its deadline the overload policy decides how
+    the schedule recovers:
+    - drop: frame slots which have completely passed are skipped and the
+        schedule stays aligned to the original grid.
+    - catch_up: late frames are started immediately, back to back, until the
+        schedule has recovered.
+    - reset: the schedule restarts from the current time.
+    """
+
+    def __init__(self, frequency=60, policy=POLICY_DROP, history=120):
+        self._lateness = deque((), history)
+        self._frames = 0
+        self._missed = 0
+        self._dropped = 0
+
+        self.set_frequency(frequency)
+        self.set_policy(policy)
+        self.reset()
+
+    def set_frequency(self, frequency):
+        frequency = float(frequency)
+        if frequency <= 0:
+            raise ValueError(f"invalid frame frequency {frequency}")
+        self._frequency = frequency
+        self._period = 1 / frequency
+
+    def set_policy(self, policy):
+        if policy not in policies:
+            raise ValueError(f"invalid frame policy {policy}")
+        self._policy = policy
+
+    def reset(self):
+        """
+        Restart the schedule so that the next deadline is one period from now.
+        """
+        self._deadline = time.monotonic() + self._period
+
+    async def wait(self):
+        """
+        Wait for the start of the next frame.
+        """
+        now = time.monotonic()
+        remaining = self._deadline - now
+
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+            now = time.monotonic()
+            self._lateness.append(max(now - self._deadline, 0.0))
+            self._deadline += self._period
+        else:
+            # the deadline was missed, but other tasks still get a chance to run
+            self._missed += 1
+            self._lateness.append(-remaining)
+            self._handle_overload(now)
+            await asyncio.sleep(0)
+
+        self._frames += 1
+
+    def _handle_overload(self, now):
+        if self._policy == POLICY_DROP:
+            # advance to the first deadline on the grid which is in the future
+            slots = int((now - self._deadline) // self._period) + 1
+            self._dropped += slots - 1
+            self._deadline += slots * self._period
+        elif self._policy == POLICY_CATCH_UP:
+            self._deadline += self._period
+        elif self._policy == POLICY_RESET:
+            self._deadline = now + self._period
+
+    @property
+    def frequency(self):
+        return self._frequency
+
+    @property
+    def period(self):
+        return self._period
+
+    @property
+    def policy(self):
+        return self._policy
+
+    @property
+    def stats(self):
+        lateness = self._lateness
+        mean_ms = 0.0
+        max_ms = 0.0
+        if len(lateness):
+            mean_ms = 1000 * sum(lateness) / len(lateness)
+            max_ms = 1000 * max(lateness)
+        return {
+            "frequency": self._frequency,
+            "policy": self._policy,
+            "frames": self._frames,
+            "missed": self._missed,
+            "dropped": self._dropped,
+            "jitter_ms": {
+                "mean": mean_ms,
+                "max": max_ms,
+            },
+        }
@@ -1,20 +1,30 @@
 class FramerateHistory:
+    """
+    Averages the most recent frame periods.
+
+    Keyword Arguments:
+        n: int - number of periods averaged
+    """
+
     def __init__(self, n=10):
         self._n = n
         self._period_history = [0] * self._n
-        self._average_period_ms = 0
-
-    def _compute_average(self):
-        self._average_period_ms = sum(self._period_history) / len(self._period_history)
+        self._index = 0
+        self._count = 0
 
     def record_period_ms(self, period):
-        self._period_history.append(period)
-        if len(self._period_history) > self._n:
-            self._period_history.pop(0)
+        # overwrite the oldest period so that the history keeps its size
+        self._period_history[self._index] = period
+        self._index = (self._index + 1) % self._n
+        if self._count < self._n:
+            self._count += 1
 
     def average(self):
-        self._compute_average()
-        if self._average_period_ms == 0:
+        # only periods which have been recorded count towards the average
+        if self._count == 0:
+            return None
+        average_period_ms = sum(self._period_history[: self._count]) / self._count
+        if average_period_ms == 0:
             return None
         else:
-            return 1000 / self._average_period_ms
+            return 1000 / average_period_ms
@@ -1,13 +1,23 @@
-import numpy as np
 import moderngl
 
-from .window import create_window
-from .composition import Compositor
+from .window import create_window, create_headless_window
+from .composition import Compositor, ArrayCompositor
+from .readback import Readback
+from .audio import AudioTexture
+from .correction import Corrector, white_balance
+from .resources import ResourceManager, ResourceScope
+from .resample import Resampler
 
 
-def create_environment(window, size):
+def create_environment(window, size, resources=None, layer_targets=False):
     width, height = size
 
+    # Resources
+    # Programs, the full screen quad and layer owned objects are shared
+    # through the resource manager (see ResourceManager)
+    if resources is None:
+        resources = ResourceManager(window.ctx)
+
     # Source
     # This texture is generally used by layers to render their content
     source_texture_id = 3
@@ -37,6 +47,17 @@ def create_environment(window, size):
     destination_texture_pong.use(location=destination_texture_pong_id)
     destination_fbo_pong = window.ctx.framebuffer(destination_texture_pong)
 
+    # Audio
+    # The spectrum and waveform of the selected audio source, which shader
+    # layers may sample directly (see AudioTexture for the layout)
+    audio_texture_id = 6
+    audio_texture = AudioTexture(window.ctx, location=audio_texture_id)
+
+    # Resampler
+    # Brings layers rendered at a different scale to the display resolution
+    resampler_texture_id = 8
+    resampler = Resampler(window.ctx, resampler_texture_id, resources)
+
     # # Framebuffer
     # framebuffer_texture_id = 0
     # framebuffer_texture = window.ctx.texture((width, height), 4)
@@ -57,72 +78,13 @@ def create_environment(window, size):
             destination_texture_pong,
             destination_fbo_pong,
         ),
+        "audio": (audio_texture_id, audio_texture.texture, None),
+        # the runtime uses this to upload new audio data each frame
+        "audio_texture": audio_texture,
+        "resources": resources,
+        # layers draw into render targets of their own instead of the source
+        "layer_targets": layer_targets,
+        # layers rendered at a render scale other than 1 are resampled with this
+        "resampler": resampler,
         # "framebuffer": (framebuffer_texture_id, framebuffer_texture, None),
     }
-
-
-class Corrector:
-    def __init__(self, ctx, aspect_ratio):
-        self.ctx = ctx
-
-        vertex_shader = """
-            #version 330 core
-            in vec2 in_vert;
-            out vec2 uv;
-            void main() {
-                gl_Position = vec4(in_vert, 0.0, 1.0);
-                uv = in_vert * 0.5 + 0.5;
-            }
-        """
-        fragment_shader = """
-            #version 330 core
-            uniform sampler2D Destination;
-            uniform float brightness;
-            in vec2 uv;
-            out vec4 fragColor;            
-            void main() {
-                float gamma = 2.2;
-                vec4 destinationColor = texture(Destination, uv);
-
-                // Apply brightness adjustment
-                destinationColor.rgb *= brightness;
-
-                // Perform gamma correction
-                destinationColor.r = pow(destinationColor.r, 1.0 / gamma);
-                destinationColor.g = pow(destinationColor.g, 1.0 / gamma);
-                destinationColor.b = pow(destinationColor.b, 1.0 / gamma);
-
-                // Output the final color
-                fragColor = destinationColor;
-
-                // debugging
-                fragColor = texture(Destination, uv);
-            }
-        """
-
-        self._ctx = ctx
-        self._program = self._ctx.program(
-            vertex_shader=vertex_shader,
-            fragment_shader=fragment_shader,
-        )
-
-        vertices = np.array(
-            [
-                -1.0,
-                -1.0,
-                1.0,
-                -1.0,
-                -1.0,
-                1.0,
-                1.0,
-                1.0,
-            ],
-            dtype="f4",
-        )
-        vbo = self._ctx.buffer(vertices)
-        self._vao = self._ctx.simple_vertex_array(self._program, vbo, "in_vert")
-
-    def render(self, destination, brightness=1.0):
-        self._program["Destination"] = destination
-        self._program["brightness"] = brightness
-        self._vao.render(moderngl.TRIANGLE_STRIP)
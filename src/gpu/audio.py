@@ -0,0 +1,93 @@
+import numpy
+import moderngl
+
+
+class AudioTexture:
+    """
+    A single channel float texture holding the latest audio data.
+
+    Rows of the texture:
+    - 0: fft magnitudes from 0 Hz (u = 0.0) to half the sample rate (u = 1.0)
+    - 1: the reshaped (nonlinear) fft output of the source
+    - 2 and up: the waveform of recent blocks, newest first, from the oldest
+        sample in the block (u = 0.0) to the newest (u = 1.0)
+
+    Every row is resampled to the width of the texture so that shaders do not
+    depend on the block length of the selected source. A row r is sampled at
+    v = (r + 0.5) / (HISTORY_ROW + history).
+
+    The texture is only written when the source has processed a new block,
+    so frames between audio blocks cost nothing.
+
+    Keyword Arguments:
+        width: int - number of samples per row
+        history: int - number of waveform blocks to keep
+        location: int - texture unit the texture is bound to
+    """
+
+    SPECTRUM_ROW = 0
+    RESHAPED_ROW = 1
+    HISTORY_ROW = 2
+
+    def __init__(self, ctx, width=512, history=16, location=6):
+        self._width = width
+        self._history = history
+        self._location = location
+
+        self._rows = numpy.zeros((self.HISTORY_ROW + history, width), dtype="f4")
+        self._texture = ctx.texture((width, len(self._rows)), 1, self._rows, dtype="f4")
+        self._texture.filter = (moderngl.LINEAR, moderngl.LINEAR)
+        self._texture.repeat_x = False
+        self._texture.repeat_y = False
+        self._texture.use(location=location)
+
+        self._timestamp = None
+        self._indices = {}
+
+    def _resample(self, values, row):
+        # nearest sample lookup with a table cached per input length
+        n = len(values)
+        if n == 0:
+            row[:] = 0
+            return
+        if n not in self._indices:
+            self._indices[n] = numpy.arange(self._width) * n // self._width
+        numpy.take(values, self._indices[n], out=row)
+
+    def update(self, source):
+        """
+        Uploads the latest data of an audio source if it has changed.
+        """
+        timestamp = source.features.timestamp
+        if timestamp == self._timestamp:
+            return
+        self._timestamp = timestamp
+
+        rows = self._rows
+        self._resample(source.fft.output.array, rows[self.SPECTRUM_ROW])
+        self._resample(source.reshaped_fft_output.array, rows[self.RESHAPED_ROW])
+
+        # scroll the waveform history by one block
+        rows[self.HISTORY_ROW + 1 :] = rows[self.HISTORY_ROW : -1]
+        self._resample(source.fft.input.array, rows[self.HISTORY_ROW])
+
+        self._texture.write(rows)
+
+    def release(self):
+        self._texture.release()
+
+    @property
+    def texture(self):
+        return self._texture
+
+    @property
+    def location(self):
+        return self._location
+
+    @property
+    def width(self):
+        return self._width
+
+    @property
+    def history(self):
+        return self._history
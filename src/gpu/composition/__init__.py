@@ -1,5 +1,6 @@
 import numpy as np
 import moderngl
+from ..resources import ResourceManager
 
 COMPOSITOR_ALPHA_CLEAR = 0
 COMPOSITOR_ALPHA_COPY = 1
@@ -35,9 +36,68 @@ modes = {
     "alpha_plus_darker": COMPOSITOR_ALPHA_PLUS_DARKER,
 }
 
+# glsl function shared by the compositors which folds a (brightness scaled)
+# source color onto a destination color according to the composition mode
+COMPOSE_GLSL = """
+    vec4 compose(int composition_mode, vec4 srcColor, vec4 dstColor) {
+        switch (composition_mode) {
+            case -1:
+                // debugging
+                return vec4(0.0, 1.0, 1.0, 1.0);
+            case 0:
+                // alpha clear
+                return vec4(0.0, 0.0, 0.0, 0.0);
+            case 1:
+                // alpha copy
+                return srcColor;
+            case 2:
+                // alpha source
+                return srcColor;
+            case 3:
+                // alpha destination
+                return dstColor;
+            case 4:
+                // alpha source over
+                return srcColor + dstColor * (1.0 - srcColor.a);
+            case 5:
+                // alpha destination over
+                return dstColor + srcColor * (1.0 - dstColor.a);
+            case 6:
+                // alpha source in
+                return srcColor * dstColor.a;
+            case 7:
+                // alpha destination in
+                return dstColor * srcColor.a;
+            case 8:
+                // alpha source out
+                return srcColor * (1.0 - dstColor.a);
+            case 9:
+                // alpha destination out
+                return dstColor * (1.0 - srcColor.a);
+            case 10:
+                // alpha source atop
+                return srcColor * dstColor.a + dstColor * (1.0 - srcColor.a);
+            case 11:
+                // alpha destination atop
+                return dstColor * srcColor.a + srcColor * (1.0 - dstColor.a);
+            case 12:
+                // alpha xor
+                return srcColor * (1.0 - dstColor.a) + dstColor * (1.0 - srcColor.a);
+            case 13:
+                // alpha plus lighter
+                return min(srcColor + dstColor, vec4(1.0));
+            case 14:
+                // alpha plus darker
+                return max(srcColor + dstColor - vec4(1.0), vec4(0.0));
+            default:
+                return vec4(0.0, 0.0, 1.0, 1.0);
+        }
+    }
+"""
+
 
 class Compositor:
-    def __init__(self, ctx, aspect_ratio=1.0):
+    def __init__(self, ctx, aspect_ratio=1.0, resources=None):
         vertex_shader = """
             #version 330 core
             in vec2 in_vert;
@@ -47,7 +107,8 @@ class Compositor:
                 uv = in_vert * 0.5 + 0.5;
             }
         """
-        fragment_shader = """
+        fragment_shader = (
+            """
             #version 330 core
             uniform int composition_mode;
             in vec2 uv;
@@ -55,124 +116,21 @@ class Compositor:
             uniform sampler2D Destination;
             uniform float brightness;
             out vec4 fragColor;
+            """
+            + COMPOSE_GLSL
+            + """
             void main() {
                 vec4 srcColor = texture(Source, uv);
                 vec4 scaledSourceColor = vec4(srcColor.rgb * brightness, srcColor.a);
-                switch (composition_mode) {
-                    case -1: {
-                        // debugging
-                        fragColor = vec4(0.0, 1.0, 1.0, 1.0);
-                    }
-                    case 0: {
-                        // alpha clear
-                        fragColor = vec4(0.0, 0.0, 0.0, 0.0);
-                        break;
-                    }
-                    case 1: {
-                        // alpha copy
-                        fragColor = scaledSourceColor;
-                        break;
-                    }
-                    case 2: {
-                        // alpha source
-                        fragColor = scaledSourceColor;
-                        break;
-                    }
-                    case 3: {
-                        // alpha destination
-                        fragColor = texture(Destination, uv);
-                        break;
-                    }
-                    case 4: {
-                        // alpha source over
-                        vec4 srcColor = scaledSourceColor;
-                        vec4 dstColor = texture(Destination, uv);
-                        fragColor = srcColor + dstColor * (1.0 - srcColor.a);
-                        break;
-                    }
-                    case 5: {
-                        // alpha destination over
-                        vec4 srcColor = scaledSourceColor;
-                        vec4 dstColor = texture(Destination, uv);
-                        fragColor = dstColor + srcColor * (1.0 - dstColor.a);
-                        break;
-                    }
-                    case 6: {
-                        // alpha source in
-                        vec4 srcColor = scaledSourceColor;
-                        vec4 dstColor = texture(Destination, uv);
-                        fragColor = srcColor * dstColor.a;
-                        break;
-                    }
-                    case 7: {
-                        // alpha destination in
-                        vec4 srcColor = scaledSourceColor;
-                        vec4 dstColor = texture(Destination, uv);
-                        fragColor = dstColor * srcColor.a;
-                        break;
-                    }
-                    case 8: {
-                        // alpha source out
-                        vec4 srcColor = scaledSourceColor;
-                        vec4 dstColor = texture(Destination, uv);
-                        fragColor = srcColor * (1.0 - dstColor.a);
-                        break;
-                    }
-                    case 9: {
-                        // alpha destination out
-                        vec4 srcColor = scaledSourceColor;
-                        vec4 dstColor = texture(Destination, uv);
-                        fragColor = dstColor * (1.0 - srcColor.a);
-                        break;
-                    }
-                    case 10: {
-                        // alpha source atop
-                        vec4 srcColor = scaledSourceColor;
-                        vec4 dstColor = texture(Destination, uv);
-                        fragColor = srcColor * dstColor.a + dstColor * (1.0 - srcColor.a);
-                        break;
-                    }
-                    case 11: {
-                        // alpha destination atop
-                        vec4 srcColor = scaledSourceColor;
-                        vec4 dstColor = texture(Destination, uv);
-                        fragColor = dstColor * srcColor.a + srcColor * (1.0 - dstColor.a);
-                        break;
-                    }
-                    case 12: {
-                        // alpha xor
-                        vec4 srcColor = scaledSourceColor;
-                        vec4 dstColor = texture(Destination, uv);
-                        fragColor = srcColor * (1.0 - dstColor.a) + dstColor * (1.0 - srcColor.a);
-                        break;
-                    }
-                    case 13: {
-                        // alpha plus lighter
-                        vec4 srcColor = scaledSourceColor;
-                        vec4 dstColor = texture(Destination, uv);
-                        fragColor = min(srcColor + dstColor, vec4(1.0));
-                        break;
-                    }
-                    case 14: {
-                        // alpha plus darker
-                        vec4 srcColor = scaledSourceColor;
-                        vec4 dstColor = texture(Destination, uv);
-                        fragColor = max(srcColor + dstColor - vec4(1.0), vec4(0.0));
-                        break;
-                    }
-                    default: {
-                        fragColor = vec4(0.0, 0.0, 1.0, 1.0);
-                        break;
-                    }
-                }
+                fragColor = compose(composition_mode, scaledSourceColor, texture(Destination, uv));
             }
         """
+        )
 
+        if resources is None:
+            resources = ResourceManager(ctx)
         self._ctx = ctx
-        self._program = self._ctx.program(
-            vertex_shader=vertex_shader,
-            fragment_shader=fragment_shader,
-        )
+        self._program = resources.program(vertex_shader, fragment_shader)
 
         # Compute the vertices of a rectangle with the given aspect ratio
         # (width / height) and a maximum dimension of 2.0 (the rectangle
@@ -194,22 +152,7 @@ class Compositor:
         #          1.0 * aspect_ratio,  1.0,
         #     ], dtype='f4')
 
-        vertices = np.array(
-            [
-                -1.0,
-                -1.0,
-                1.0,
-                -1.0,
-                -1.0,
-                1.0,
-                1.0,
-                1.0,
-            ],
-            dtype="f4",
-        )
-
-        vbo = self._ctx.buffer(vertices)
-        self._vao = self._ctx.simple_vertex_array(self._program, vbo, "in_vert")
+        self._vao = resources.quad(self._program)
 
     def render(self, source, destination, mode, brightness):
         self._program["Source"].value = source
@@ -221,3 +164,163 @@ class Compositor:
         # print(self._program['composition_mode'].value)
         # print(self._program['Source'].value)
         # print(self._program['Destination'].value)
+
+
+class ArrayCompositor:
+    """
+    Composes an entire stack of layers in a single pass.
+
+    Layers are staged, in order, into consecutive slots of a pixel buffer
+    object. CPU layers copy their canvas memory into the slot and GPU layers
+    copy their framebuffer into the slot without leaving the GPU. When the
+    stack is rendered the staged slots are uploaded into a 2D texture array
+    at once, per-layer composition modes and brightness are written to a
+    uniform buffer, and one full-screen draw folds every layer onto a cleared
+    destination.
+
+    Keyword Arguments:
+        location: int - texture unit used to sample the layer array
+        capacity: int - number of layer slots allocated initially, the
+            capacity grows as needed up to MAX_LAYERS
+    """
+
+    MAX_LAYERS = 256
+
+    def __init__(self, ctx, size, location=4, capacity=8, resources=None):
+        vertex_shader = """
+            #version 330 core
+            in vec2 in_vert;
+            out vec2 uv;
+            void main() {
+                gl_Position = vec4(in_vert, 0.0, 1.0);
+                uv = in_vert * 0.5 + 0.5;
+            }
+        """
+        fragment_shader = (
+            f"""
+            #version 330 core
+            #define MAX_LAYERS {ArrayCompositor.MAX_LAYERS}
+            in vec2 uv;
+            uniform sampler2DArray Layers;
+            uniform int layer_count;
+            layout(std140) uniform LayerParams {{
+                // x: composition mode, y: brightness
+                vec4 params[MAX_LAYERS];
+            }};
+            out vec4 fragColor;
+            """
+            + COMPOSE_GLSL
+            + """
+            void main() {
+                vec4 dstColor = vec4(0.0, 0.0, 0.0, 0.0);
+                for (int i = 0; i < layer_count; i++) {
+                    vec4 srcColor = texture(Layers, vec3(uv, float(i)));
+                    vec4 scaledSourceColor = vec4(srcColor.rgb * params[i].y, srcColor.a);
+                    dstColor = compose(int(params[i].x), scaledSourceColor, dstColor);
+                }
+                fragColor = dstColor;
+            }
+        """
+        )
+
+        if resources is None:
+            resources = ResourceManager(ctx)
+        self._ctx = ctx
+        self._program = resources.program(vertex_shader, fragment_shader)
+
+        self._vao = resources.quad(self._program)
+
+        self._size = size
+        self._location = location
+        width, height = self._size
+        self._slot_bytes = width * height * 4
+
+        # per-layer parameters, laid out as std140 vec4s
+        self._params = np.zeros((ArrayCompositor.MAX_LAYERS, 4), dtype="f4")
+        self._params_buffer = self._ctx.buffer(reserve=self._params.nbytes)
+        self._program["LayerParams"].binding = 0
+
+        self._capacity = 0
+        self._layers = None
+        self._staging = None
+        self._reserve(capacity)
+
+        self._count = 0
+
+    def _reserve(self, capacity):
+        if capacity > ArrayCompositor.MAX_LAYERS:
+            raise ValueError(
+                f"cannot compose more than {ArrayCompositor.MAX_LAYERS} layers"
+            )
+        if capacity <= self._capacity:
+            return
+
+        if self._layers is not None:
+            self._layers.release()
+            self._staging.release()
+
+        width, height = self._size
+        self._layers = self._ctx.texture_array((width, height, capacity), 4)
+        self._layers.filter = (moderngl.NEAREST, moderngl.NEAREST)
+        self._layers.repeat_x = False
+        self._layers.repeat_y = False
+        self._staging = self._ctx.buffer(reserve=capacity * self._slot_bytes)
+        self._capacity = capacity
+
+    def begin(self, layers):
+        """
+        Starts a new stack. Space is reserved for the given number of layers.
+        """
+        if layers > self._capacity:
+            self._reserve(min(max(layers, 2 * self._capacity), self.MAX_LAYERS))
+        self._count = 0
+
+    def _next_slot(self, mode, brightness):
+        if self._count >= self._capacity:
+            raise IndexError("more layers were staged than reserved")
+        slot = self._count
+        self._params[slot] = (mode, brightness, 0.0, 0.0)
+        self._count += 1
+        return slot
+
+    def stage_memory(self, memory, mode, brightness):
+        """
+        Stages a layer from pixel memory (e.g. a pysicgl interface memory).
+        """
+        slot = self._next_slot(mode, brightness)
+        self._staging.write(memory, offset=slot * self._slot_bytes)
+
+    def stage_framebuffer(self, fbo, mode, brightness):
+        """
+        Stages a layer from a framebuffer. The copy stays on the GPU.
+        """
+        width, height = self._size
+        slot = self._next_slot(mode, brightness)
+        fbo.read_into(
+            self._staging,
+            viewport=(0, 0, width, height),
+            components=4,
+            alignment=1,
+            write_offset=slot * self._slot_bytes,
+        )
+
+    def render(self):
+        """
+        Renders all staged layers into the currently bound framebuffer.
+        """
+        if self._count > 0:
+            width, height = self._size
+            self._layers.write(
+                self._staging, viewport=(0, 0, 0, width, height, self._count)
+            )
+            self._params_buffer.write(self._params[: self._count].tobytes())
+
+        self._layers.use(location=self._location)
+        self._params_buffer.bind_to_uniform_block(0)
+        self._program["Layers"].value = self._location
+        self._program["layer_count"].value = self._count
+        self._vao.render(moderngl.TRIANGLE_STRIP)
+
+    @property
+    def count(self):
+        return self._count
@@ -0,0 +1,173 @@
+import math
+import numpy as np
+import moderngl
+from .resources import ResourceManager
+
+
+def white_balance(temperature):
+    """
+    Returns a 3x3 matrix which tints white towards the color of a black body
+    at the given temperature in Kelvin. The brightest channel is left at
+    full scale so that the correction never clips.
+    """
+    # approximation of the black body color after Tanner Helland
+    t = temperature / 100.0
+    if t <= 66:
+        red = 1.0
+        green = (99.4708025861 * math.log(t) - 161.1195681661) / 255
+    else:
+        red = 329.698727446 * (t - 60) ** -0.1332047592 / 255
+        green = 288.1221695283 * (t - 60) ** -0.0755148492 / 255
+    if t >= 66:
+        blue = 1.0
+    elif t <= 19:
+        blue = 0.0
+    else:
+        blue = (138.5177312231 * math.log(t - 10) - 305.0447927307) / 255
+
+    rgb = np.clip(np.array([red, green, blue]), 0.0, 1.0)
+    return np.diag(rgb / rgb.max())
+
+
+class Corrector:
+    """
+    Converts the composed frame into the values sent to the LEDs in a
+    single shader pass.
+
+    Each pixel is multiplied by the color matrix and the global brightness,
+    then passed through a per channel lookup table which holds the gamma
+    curve of the LEDs. Temporal dithering adds a threshold which changes
+    every frame before quantizing to 8 bits, so that levels between two
+    output values are shown as an average over time instead of banding.
+
+    Keyword Arguments:
+        gamma: float or tuple - exponent of the LED response per channel
+            (output = input ** gamma)
+        color_matrix: numpy.ndarray - 3x3 matrix applied to linear colors,
+            e.g. from white_balance()
+        dither: bool - enable temporal dithering
+        lut_size: int - entries in each lookup table
+        location: int - texture unit of the lookup table
+        resources: ResourceManager - shares the program and the quad
+    """
+
+    def __init__(
+        self,
+        ctx,
+        aspect_ratio,
+        gamma=1.0,
+        color_matrix=None,
+        dither=True,
+        lut_size=1024,
+        location=7,
+        resources=None,
+    ):
+        self.ctx = ctx
+
+        vertex_shader = """
+            #version 330 core
+            in vec2 in_vert;
+            out vec2 uv;
+            void main() {
+                gl_Position = vec4(in_vert, 0.0, 1.0);
+                uv = in_vert * 0.5 + 0.5;
+            }
+        """
+        fragment_shader = """
+            #version 330 core
+            uniform sampler2D Destination;
+            uniform sampler2D Lut;
+            uniform float lut_size;
+            uniform mat3 color_matrix;
+            uniform float brightness;
+            uniform bool dither;
+            uniform int frame;
+            in vec2 uv;
+            out vec4 fragColor;
+
+            // interleaved gradient noise, offset every frame
+            float threshold(vec2 position) {
+                position += 5.588238 * float(frame & 63);
+                return fract(52.9829189 * fract(dot(position, vec2(0.06711056, 0.00583715))));
+            }
+
+            void main() {
+                vec3 color = texture(Destination, uv).rgb;
+
+                // white balance and brightness
+                color = clamp(color_matrix * color * brightness, 0.0, 1.0);
+
+                // per channel response curves
+                color.r = texture(Lut, vec2((color.r * (lut_size - 1.0) + 0.5) / lut_size, 0.5)).r;
+                color.g = texture(Lut, vec2((color.g * (lut_size - 1.0) + 0.5) / lut_size, 0.5)).g;
+                color.b = texture(Lut, vec2((color.b * (lut_size - 1.0) + 0.5) / lut_size, 0.5)).b;
+
+                // quantize to 8 bits
+                vec3 level = color * 255.0;
+                if (dither) {
+                    // (clamped so that exact levels are never pushed down by rounding)
+                    level = floor(level + clamp(threshold(gl_FragCoord.xy), 0.001, 0.999));
+                } else {
+                    level = floor(level + 0.5);
+                }
+                fragColor = vec4(min(level, 255.0) / 255.0, 1.0);
+            }
+        """
+
+        if resources is None:
+            resources = ResourceManager(ctx)
+        self._ctx = ctx
+        self._program = resources.program(vertex_shader, fragment_shader)
+        self._vao = resources.quad(self._program)
+
+        # lookup table holding the response of each channel
+        self._location = location
+        self._lut_size = lut_size
+        self._lut = self._ctx.texture((lut_size, 1), 3, dtype="f4")
+        self._lut.filter = (moderngl.LINEAR, moderngl.LINEAR)
+        self._lut.repeat_x = False
+        self._lut.repeat_y = False
+
+        self._frame = 0
+        self.set_gamma(gamma)
+        self.set_color_matrix(color_matrix)
+        self.dither = dither
+
+    def set_gamma(self, gamma):
+        """
+        Fills the lookup tables with power curves.
+
+        Keyword Arguments:
+            gamma: float or tuple - one exponent, or one per channel
+        """
+        gamma = np.broadcast_to(np.asarray(gamma, dtype="f4"), (3,))
+        x = np.linspace(0.0, 1.0, self._lut_size, dtype="f4")
+        self.set_lut(x[:, np.newaxis] ** gamma)
+
+    def set_lut(self, table):
+        """
+        Sets arbitrary response curves from an array of shape (lut_size, 3)
+        with values from 0.0 to 1.0.
+        """
+        table = np.ascontiguousarray(table, dtype="f4")
+        if table.shape != (self._lut_size, 3):
+            raise ValueError("lookup table does not match the lut size")
+        self._lut.write(table)
+
+    def set_color_matrix(self, matrix=None):
+        if matrix is None:
+            matrix = np.identity(3)
+        # glsl matrices are column major
+        matrix = np.asarray(matrix, dtype="f4").reshape(3, 3)
+        self._program["color_matrix"].write(matrix.T.tobytes())
+
+    def render(self, destination, brightness=1.0):
+        self._lut.use(location=self._location)
+        self._program["Destination"] = destination
+        self._program["Lut"] = self._location
+        self._program["lut_size"] = float(self._lut_size)
+        self._program["brightness"] = brightness
+        self._program["dither"] = self.dither
+        self._program["frame"] = self._frame
+        self._frame = (self._frame + 1) & 0xFFFF
+        self._vao.render(moderngl.TRIANGLE_STRIP)
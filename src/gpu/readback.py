@@ -0,0 +1,65 @@
+class Readback:
+    """
+    Reads a framebuffer back to the CPU through a ring of pixel buffer objects.
+
+    Each frame the framebuffer is read into the next pixel buffer object in
+    the ring. This read is queued on the GPU and does not block the CPU. The
+    oldest pixel buffer in the ring, whose transfer completed while later
+    frames rendered, is then copied into a preallocated host buffer. Output
+    therefore lags rendering by (depth - 1) frames in exchange for removing
+    the GPU -> CPU synchronization point.
+
+    Keyword Arguments:
+        components: int - number of color components per pixel to read
+        depth: int - number of pixel buffer objects in the ring (>= 2)
+
+    Notes:
+        The returned memoryview refers to memory that is reused every frame.
+        Consumers that need the data beyond the current frame must copy it.
+    """
+
+    def __init__(self, ctx, size, components=3, depth=2):
+        if depth < 2:
+            raise ValueError("readback requires at least two pixel buffers")
+
+        width, height = size
+        self._viewport = (0, 0, width, height)
+        self._components = components
+
+        nbytes = width * height * components
+        self._pbos = [ctx.buffer(reserve=nbytes) for _ in range(depth)]
+        self._memory = bytearray(nbytes)
+        self._view = memoryview(self._memory)
+
+        self._index = 0
+        self._filled = 0
+
+    def read(self, fbo):
+        """
+        Queues a read of the framebuffer and returns a memoryview of the
+        oldest frame in the ring. Returns None until the ring has filled.
+        """
+        fbo.read_into(
+            self._pbos[self._index],
+            viewport=self._viewport,
+            components=self._components,
+            alignment=1,
+        )
+        self._index = (self._index + 1) % len(self._pbos)
+
+        if self._filled < len(self._pbos) - 1:
+            self._filled += 1
+            return None
+
+        # the next pixel buffer in the ring holds the oldest frame
+        self._pbos[self._index].read_into(self._memory)
+        return self._view
+
+    def release(self):
+        for pbo in self._pbos:
+            pbo.release()
+        self._pbos = []
+
+    @property
+    def components(self):
+        return self._components
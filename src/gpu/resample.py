@@ -0,0 +1,84 @@
+import moderngl
+from .resources import ResourceManager
+
+
+class Resampler:
+    """
+    Resamples a texture into a framebuffer of a different size.
+
+    Larger textures (supersampled layers) are reduced with a box filter
+    which averages every texel covered by an output pixel. Smaller textures
+    (layers rendered at a reduced resolution) are enlarged with a bilinear
+    filter. Colors are averaged as they are stored, which is correct for
+    the premultiplied colors that the compositors expect.
+
+    Keyword Arguments:
+        location: int - texture unit which the source is bound to
+        resources: ResourceManager - shares the program and the quad
+    """
+
+    def __init__(self, ctx, location=8, resources=None):
+        vertex_shader = """
+            #version 330 core
+            in vec2 in_vert;
+            void main() {
+                gl_Position = vec4(in_vert, 0.0, 1.0);
+            }
+        """
+        fragment_shader = """
+            #version 330 core
+            uniform sampler2D Source;
+            uniform vec2 output_size;
+            out vec4 fragColor;
+
+            vec4 fetch(ivec2 position, ivec2 size) {
+                return texelFetch(Source, clamp(position, ivec2(0), size - 1), 0);
+            }
+
+            void main() {
+                ivec2 size = textureSize(Source, 0);
+                vec2 ratio = vec2(size) / output_size;
+                vec2 pixel = floor(gl_FragCoord.xy);
+
+                if (ratio.x >= 1.0 && ratio.y >= 1.0) {
+                    // average the texels whose centers lie within the pixel
+                    ivec2 first = ivec2(ceil(pixel * ratio - 0.5));
+                    ivec2 last = ivec2(ceil((pixel + 1.0) * ratio - 0.5));
+                    vec4 sum = vec4(0.0);
+                    for (int y = first.y; y < last.y; y++) {
+                        for (int x = first.x; x < last.x; x++) {
+                            sum += fetch(ivec2(x, y), size);
+                        }
+                    }
+                    fragColor = sum / float((last.x - first.x) * (last.y - first.y));
+                } else {
+                    // interpolate between the four nearest texels
+                    vec2 position = gl_FragCoord.xy * ratio - 0.5;
+                    ivec2 base = ivec2(floor(position));
+                    vec2 f = position - floor(position);
+                    vec4 bottom = mix(
+                        fetch(base, size), fetch(base + ivec2(1, 0), size), f.x
+                    );
+                    vec4 top = mix(
+                        fetch(base + ivec2(0, 1), size), fetch(base + ivec2(1, 1), size), f.x
+                    );
+                    fragColor = mix(bottom, top, f.y);
+                }
+            }
+        """
+
+        if resources is None:
+            resources = ResourceManager(ctx)
+        self._program = resources.program(vertex_shader, fragment_shader)
+        self._vao = resources.quad(self._program)
+        self._location = location
+
+    def render(self, source, fbo):
+        """
+        Draws the source texture over the whole framebuffer.
+        """
+        source.use(location=self._location)
+        fbo.use()
+        self._program["Source"] = self._location
+        self._program["output_size"] = tuple(float(v) for v in fbo.size)
+        self._vao.render(moderngl.TRIANGLE_STRIP)
@@ -0,0 +1,247 @@
+import hashlib
+import numpy as np
+import moderngl
+from collections import OrderedDict
+
+# a triangle strip which covers the whole viewport
+QUAD_VERTICES = np.array([-1.0, -1.0, 1.0, -1.0, -1.0, 1.0, 1.0, 1.0], dtype="f4")
+
+
+class ResourceManager:
+    """
+    Shares GPU objects between their users and releases them once they are
+    no longer used.
+
+    Programs are cached by a hash of their sources so that layers which run
+    the same shader share one compiled program. Programs which are no longer
+    referenced are kept for reuse (e.g. when a stack is reloaded) until more
+    than idle_programs of them are waiting, at which point the least
+    recently used is released.
+
+    Every full screen pass draws the same quad from one shared vertex buffer.
+
+    Textures and framebuffers are reference counted and released as soon as
+    their count drops to zero. Users which hold several objects, such as
+    layers, acquire them through a ResourceScope which releases them all at
+    once.
+
+    Render targets are pooled by size and format instead, so that a target
+    given back with recycle() is handed out again rather than reallocated.
+
+    Keyword Arguments:
+        idle_programs: int - number of unreferenced programs kept for reuse
+    """
+
+    def __init__(self, ctx, idle_programs=16):
+        self._ctx = ctx
+        self._idle_capacity = idle_programs
+
+        # live programs by source hash, and the hash of each live program
+        self._programs = {}
+        self._program_keys = {}
+        self._idle = OrderedDict()
+
+        # reference counts by object identity
+        self._counts = {}
+
+        # the shared quad and the vertex arrays which bind it to programs
+        self._quad = ctx.buffer(QUAD_VERTICES)
+        self._quads = {}
+
+        # free render targets by format, and the format of each target in use
+        self._targets = {}
+        self._target_keys = {}
+
+        # statistics
+        self._compiled = 0
+        self._reused = 0
+
+    def scope(self):
+        """
+        Returns a new scope which tracks the objects acquired through it.
+        """
+        return ResourceScope(self)
+
+    def program(self, vertex_shader, fragment_shader=None, geometry_shader=None):
+        """
+        Returns a program compiled from the given sources and acquires it.
+        """
+        sources = (vertex_shader, fragment_shader, geometry_shader)
+        key = hashlib.sha1(
+            "\0".join(source or "" for source in sources).encode()
+        ).hexdigest()
+
+        program = self._programs.get(key)
+        if program is None:
+            program = self._idle.pop(key, None)
+            if program is None:
+                program = self._ctx.program(
+                    vertex_shader=vertex_shader,
+                    fragment_shader=fragment_shader,
+                    geometry_shader=geometry_shader,
+                )
+                self._compiled += 1
+            else:
+                self._reused += 1
+            self._programs[key] = program
+            self._program_keys[id(program)] = key
+        else:
+            self._reused += 1
+
+        return self.acquire(program)
+
+    def quad(self, program, attribute="in_vert"):
+        """
+        Returns a vertex array which draws the shared quad with a program.
+        The vertex array lives as long as the program.
+        """
+        key = (id(program), attribute)
+        vao = self._quads.get(key)
+        if vao is None:
+            vao = self._ctx.simple_vertex_array(program, self._quad, attribute)
+            self._quads[key] = vao
+        return vao
+
+    def texture(self, *args, **kwargs):
+        """
+        Creates a texture (see moderngl.Context.texture) and acquires it.
+        """
+        return self.acquire(self._ctx.texture(*args, **kwargs))
+
+    def framebuffer(self, *args, **kwargs):
+        """
+        Creates a framebuffer (see moderngl.Context.framebuffer) and acquires it.
+        """
+        return self.acquire(self._ctx.framebuffer(*args, **kwargs))
+
+    def render_target(self, size, components=4, dtype="f1"):
+        """
+        Returns a (texture, framebuffer) pair from the pool, creating one when
+        none of the requested format is free. Give it back with recycle().
+        """
+        key = (tuple(size), components, dtype)
+        free = self._targets.setdefault(key, [])
+        if len(free):
+            target = free.pop()
+        else:
+            texture = self._ctx.texture(size, components, dtype=dtype)
+            texture.filter = (moderngl.NEAREST, moderngl.NEAREST)
+            texture.repeat_x = False
+            texture.repeat_y = False
+            target = (texture, self._ctx.framebuffer(texture))
+        self._target_keys[id(target)] = key
+        return target
+
+    def recycle(self, target):
+        """
+        Returns a render target to the pool.
+        """
+        key = self._target_keys.pop(id(target), None)
+        if key is not None:
+            self._targets[key].append(target)
+
+    def acquire(self, obj):
+        """
+        Adds a reference to an object and returns the object.
+        """
+        entry = self._counts.get(id(obj))
+        if entry is None:
+            self._counts[id(obj)] = [obj, 1]
+        else:
+            entry[1] += 1
+        return obj
+
+    def release(self, obj):
+        """
+        Removes a reference to an object, releasing it when none are left.
+        """
+        entry = self._counts.get(id(obj))
+        if entry is None:
+            return
+        entry[1] -= 1
+        if entry[1] > 0:
+            return
+        del self._counts[id(obj)]
+
+        key = self._program_keys.pop(id(obj), None)
+        if key is None:
+            obj.release()
+            return
+
+        # keep the program around in case it is needed again
+        del self._programs[key]
+        self._idle[key] = obj
+        while len(self._idle) > self._idle_capacity:
+            _, program = self._idle.popitem(last=False)
+            self._release_program(program)
+
+    def _release_program(self, program):
+        for key in [key for key in self._quads if key[0] == id(program)]:
+            self._quads.pop(key).release()
+        program.release()
+
+    @property
+    def stats(self):
+        return {
+            "programs": len(self._programs),
+            "idle_programs": len(self._idle),
+            "objects": len(self._counts),
+            "render_targets": len(self._target_keys),
+            "free_render_targets": sum(len(free) for free in self._targets.values()),
+            "compiled": self._compiled,
+            "reused": self._reused,
+        }
+
+
+class ResourceScope:
+    """
+    The GPU objects held by one user of a ResourceManager.
+
+    Objects acquired through the scope are released together by release(),
+    e.g. when a layer is removed or its shard is reloaded.
+    """
+
+    def __init__(self, manager):
+        self._manager = manager
+        self._held = []
+
+    def _hold(self, obj):
+        self._held.append(obj)
+        return obj
+
+    def program(self, vertex_shader, fragment_shader=None, geometry_shader=None):
+        return self._hold(
+            self._manager.program(vertex_shader, fragment_shader, geometry_shader)
+        )
+
+    def quad(self, program, attribute="in_vert"):
+        return self._manager.quad(program, attribute)
+
+    def texture(self, *args, **kwargs):
+        return self._hold(self._manager.texture(*args, **kwargs))
+
+    def framebuffer(self, *args, **kwargs):
+        return self._hold(self._manager.framebuffer(*args, **kwargs))
+
+    def acquire(self, obj):
+        return self._hold(self._manager.acquire(obj))
+
+    def release(self, obj=None):
+        """
+        Releases one object held by the scope, or all of them.
+        """
+        if obj is None:
+            held, self._held = self._held, []
+            for obj in reversed(held):
+                self._manager.release(obj)
+            return
+
+        for idx, held in enumerate(self._held):
+            if held is obj:
+                del self._held[idx]
+                self._manager.release(obj)
+                return
+
+    @property
+    def manager(self):
+        return self._manager
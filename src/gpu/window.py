@@ -1,7 +1,9 @@
+import sys
 import moderngl
 import moderngl_window
 
 from moderngl_window import Timer, weakref
+from moderngl_window.context.headless import Window as HeadlessWindow
 
 
 def create_window(size=(800, 800), aspect_ratio=1.0):
@@ -94,3 +96,46 @@ def create_window(size=(800, 800), aspect_ratio=1.0):
     #     print("Framebuffer Samples:", window.ctx.screen.samples)
 
     return (window, timer)
+
+
+def create_headless_window(size, backend=None):
+    """
+    Creates a headless window and returns the window object.
+    The window is a moderngl_window headless window backed by a standalone
+    ModernGL context. Rendering happens in an offscreen framebuffer
+    (window.fbo) so no display server is required.
+
+    Arguments:
+        size: (int, int) - the size of the offscreen framebuffer in pixels,
+            usually the size of the LED display
+
+    Keyword Arguments:
+        backend: str - the standalone context backend. defaults to "egl" on
+            linux so that no X server is needed.
+
+    Notes:
+        There is no vsync or buffer swap in headless mode. Callers should not
+        call window.swap_buffers() as it forces the context to finish.
+    """
+    config_cls = moderngl_window.WindowConfig
+
+    moderngl_window.setup_basic_logging(config_cls.log_level)
+
+    if backend is None and sys.platform.startswith("linux"):
+        backend = "egl"
+
+    window = HeadlessWindow(
+        title=config_cls.title,
+        size=size,
+        gl_version=config_cls.gl_version,
+        aspect_ratio=size[0] / size[1],
+        samples=0,
+        backend=backend,
+    )
+    window.print_context_info()
+    moderngl_window.activate_context(window=window)
+    timer = Timer()
+    config = config_cls(ctx=window.ctx, wnd=window, timer=timer)
+    window._config = weakref.ref(config)
+
+    return (window, timer)
@@ -1,24 +1,122 @@
 from .variables.manager import VariableManager
 from .variables.types import StringVariable
 from .variables.responder import VariableResponder
+import time
+import numpy
 import socket
-import select
 import asyncio
 from artnet import ArtDMXPacket
 
+ARTNET_HEADER = b"Art-Net\0"
+ARTNET_OPCODE_DMX = 0x5000
+ARTDMX_HEADER_LENGTH = 18
+UNIVERSE_MAX_CHANNELS = 512
+
+# packets this far behind the last sequence number are treated as reordered
+# and dropped. anything further back is taken as a restarted sender.
+SEQUENCE_REORDER_WINDOW = 16
+
+
+class ChannelMap:
+    """
+    Gathers channels from a set of universes into one contiguous array.
+
+    The universes are treated as a single run of channels which starts at
+    an offset into the first universe. Indices into that run are computed
+    once, so each gather is a copy per universe followed by a single take.
+
+    Keyword Arguments:
+        start_universe: int - first universe when universes is not given
+        universes: tuple - universe ids in order, computed from the number of
+            channels by default
+        start_offset: int - channel of the first universe to start from
+    """
+
+    def __init__(
+        self, provider, total_channels, start_universe=0, universes=None, start_offset=0
+    ):
+        total_channels = int(total_channels)
+        if universes is None:
+            needed = start_offset + total_channels
+            count = -(-needed // UNIVERSE_MAX_CHANNELS)
+            universes = tuple(range(start_universe, start_universe + count))
+        self._universes = tuple(universes)
+
+        provider.register_universes(self._universes)
+        self._sources = [
+            numpy.frombuffer(
+                provider.universes[universe].buffer,
+                dtype=numpy.uint8,
+                count=UNIVERSE_MAX_CHANNELS,
+                offset=ARTDMX_HEADER_LENGTH,
+            )
+            for universe in self._universes
+        ]
+
+        self._staging = numpy.zeros(
+            (len(self._universes), UNIVERSE_MAX_CHANNELS), dtype=numpy.uint8
+        )
+        self._indices = numpy.arange(total_channels) + start_offset
+        if total_channels and self._indices[-1] >= self._staging.size:
+            raise ValueError("channel map extends beyond its universes")
+        self._channels = numpy.zeros(total_channels, dtype=numpy.uint8)
+
+    def gather(self):
+        """
+        Returns the current value of every mapped channel.
+        The returned array is reused by the next gather.
+        """
+        for row, source in zip(self._staging, self._sources):
+            numpy.copyto(row, source)
+        numpy.take(self._staging.reshape(-1), self._indices, out=self._channels)
+        return self._channels
+
+    def gather_rgb(self):
+        """
+        Returns the mapped channels as (r, g, b) rows, one per pixel.
+        """
+        channels = self.gather()
+        pixels = len(channels) // 3
+        return channels[: 3 * pixels].reshape(pixels, 3)
+
+    @property
+    def universes(self):
+        return self._universes
+
+    def __len__(self):
+        return len(self._channels)
+
 
 class ArtnetProvider:
-    def __init__(self, path, rate_limit_hz=30, poll_timeout_ms=5):
-        self._root_path = path
+    """
+    Receives Art-Net DMX packets for the universes which layers registered.
+
+    The socket is drained completely each time the event loop reports it
+    readable, so a burst of packets is handled in one wakeup without ever
+    blocking the loop. Within a burst only the newest packet of each universe
+    is kept. Packets whose sequence number is slightly older than the last
+    accepted one are discarded as stale, while a larger jump backwards
+    (e.g. a restarted sender) resynchronises the sequence.
+
+    Keyword Arguments:
+        max_packets: int - most packets handled per wakeup, which bounds the
+            time taken from other tasks under a flood
 
-        # config the rate limit for updates
-        self._rate_limit_period = 1 / rate_limit_hz
+    Notes:
+        asyncio datagram transports read a single datagram per loop
+        iteration, so the socket is registered with loop.add_reader instead.
+    """
 
-        # set up a socket
+    def __init__(self, path, max_packets=1024):
+        self._root_path = path
+        self._max_packets = max_packets
+
+        # set up a non-blocking socket
         self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self._poller = select.poll()
-        self._poller.register(self._sock, select.POLLIN)
-        self._poll_timeout_ms = poll_timeout_ms
+        self._sock.setblocking(False)
+        self._receive_buffer = bytearray(ARTDMX_HEADER_LENGTH + 512)
+        self._receive_view = memoryview(self._receive_buffer)
+        self._running = False
 
         # set up a structure to track registered endpoints
         # - layers will be able to register their interest in particular universes
@@ -26,6 +124,9 @@ class ArtnetProvider:
         # - this provider will be in charge of memory management and will provide read-only
         #   access to the memory for given layers
         self._universes = {}
+        self._universe_stats = {}
+        self._ignored = 0
+        self._wakeups = 0
 
         # declare private variables
         self._private_variable_responder = VariableResponder(
@@ -47,39 +148,126 @@ class ArtnetProvider:
         if variable.name == "host:port":
             host, port = variable.value.split(":")
             self._sender_address = socket.getaddrinfo(host, port)[0][-1]
+            if self._running:
+                self._register_with_sender()
+
+    def _register_with_sender(self):
+        try:
+            self._sock.sendto(b"add", self._sender_address)
+        except OSError as e:
+            print(f"failed to register with artnet sender: {e}")
 
     def register_universes(self, universes):
         for universe in universes:
             if not universe in self._universes:
                 self._universes[universe] = ArtDMXPacket()
+                self._universe_stats[universe] = {
+                    "received": 0,
+                    "dropped": 0,
+                    "stale": 0,
+                    "sequence": 0,
+                    "last_received": None,
+                }
 
-    async def run(self):
-        # register with server
-        self._sock.sendto(b"add", self._sender_address)
-        incoming = ArtDMXPacket()
-
-        # process incoming packets
-        # - packets are ingested until there would be a substantial block to other tasks
-        # - when a block is detected the provider sleeps for the prescribed rate limit period
-        # - after awaking from the sleep the provider will attempt to continue processing packets
-        while True:
-            # check for blocking timeout
-            res = self._poller.poll(self._poll_timeout_ms)
-            if not res:
-                # rate limit the update loop to protect other processes
-                # the outer loop will not resume until the next rate-limited opportunity
-                await asyncio.sleep(self._rate_limit_period)
+    def create_channel_map(self, total_channels, **kwargs):
+        """
+        Returns a ChannelMap over universes of this provider, registering them.
+        """
+        return ChannelMap(self, total_channels, **kwargs)
+
+    def _drain(self):
+        """
+        Reads every pending packet and keeps the newest one of each universe.
+        """
+        self._wakeups += 1
+        view = self._receive_view
+        updated = set()
+
+        for _ in range(self._max_packets):
+            try:
+                nbytes = self._sock.recv_into(self._receive_buffer)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError as e:
+                print(f"artnet receive error: {e}")
+                break
+
+            # only art-dmx packets are of interest
+            if (
+                nbytes < ARTDMX_HEADER_LENGTH
+                or view[0:8] != ARTNET_HEADER
+                or int.from_bytes(view[8:10], "little") != ARTNET_OPCODE_DMX
+            ):
+                self._ignored += 1
                 continue
 
-            bytes_recvd = self._sock.readinto(incoming.buffer)
-            incoming.update()
-            universe = incoming.universe
+            universe = int.from_bytes(view[14:16], "little") & 0x7FFF
+            if universe not in self._universes:
+                self._ignored += 1
+                continue
 
-            if universe in self._universes:
-                packet = self._universes[universe]
-                packet.ingest(incoming.buffer)
-                packet.update()
+            stats = self._universe_stats[universe]
+            stats["received"] += 1
+
+            # sequence numbers wrap from 255 to 1, zero disables sequencing
+            sequence = view[12]
+            last = stats["sequence"]
+            if (
+                sequence != 0
+                and last != 0
+                and 0 < (last - sequence) % 256 < SEQUENCE_REORDER_WINDOW
+            ):
+                stats["stale"] += 1
+                continue
+            stats["sequence"] = sequence
+
+            # a newer packet replaces one received earlier in this wakeup
+            if universe in updated:
+                stats["dropped"] += 1
+            updated.add(universe)
+
+            self._universes[universe].buffer[:nbytes] = view[:nbytes]
+
+        now = time.monotonic()
+        for universe in updated:
+            self._universes[universe].update()
+            self._universe_stats[universe]["last_received"] = now
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+
+        # register with server
+        self._running = True
+        self._register_with_sender()
+
+        # process packets whenever the socket becomes readable
+        loop.add_reader(self._sock.fileno(), self._drain)
+        try:
+            await loop.create_future()
+        finally:
+            loop.remove_reader(self._sock.fileno())
+            self._running = False
 
     @property
     def universes(self):
         return self._universes
+
+    @property
+    def stats(self):
+        now = time.monotonic()
+        universes = {}
+        for universe, stats in self._universe_stats.items():
+            age_ms = None
+            if stats["last_received"] is not None:
+                age_ms = 1000 * (now - stats["last_received"])
+            universes[universe] = {
+                "received": stats["received"],
+                "dropped": stats["dropped"],
+                "stale": stats["stale"],
+                "age_ms": age_ms,
+            }
+        return {
+            "wakeups": self._wakeups,
+            "ignored": self._ignored,
+            "universes": universes,
+        }
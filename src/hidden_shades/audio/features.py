@@ -0,0 +1,265 @@
+import math
+import time
+import numpy
+from collections import deque
+
+
+class AudioFeatures:
+    """
+    A snapshot of the features extracted from one block of audio.
+
+    Snapshots are never modified after they are published, so a layer may
+    keep a reference for as long as it likes.
+    """
+
+    def __init__(
+        self,
+        timestamp=0.0,
+        bands=None,
+        rms=0.0,
+        flux=0.0,
+        onset=False,
+        tempo=None,
+        beat_phase=0.0,
+        beat=False,
+    ):
+        if bands is None:
+            bands = numpy.zeros(0, dtype=numpy.float32)
+        bands.flags.writeable = False
+
+        self._timestamp = timestamp
+        self._bands = bands
+        self._rms = rms
+        self._flux = flux
+        self._onset = onset
+        self._tempo = tempo
+        self._beat_phase = beat_phase
+        self._beat = beat
+
+    @property
+    def timestamp(self):
+        """
+        time.monotonic() when the block was processed
+        """
+        return self._timestamp
+
+    @property
+    def bands(self):
+        """
+        mean energy in each log spaced frequency band, lowest band first
+        """
+        return self._bands
+
+    @property
+    def rms(self):
+        return self._rms
+
+    @property
+    def flux(self):
+        """
+        positive change of the spectrum since the previous block
+        """
+        return self._flux
+
+    @property
+    def onset(self):
+        return self._onset
+
+    @property
+    def tempo(self):
+        """
+        estimated tempo in beats per minute, or None until one is found
+        """
+        return self._tempo
+
+    @property
+    def beat_phase(self):
+        """
+        position within the current beat from 0.0 to 1.0
+        """
+        return self._beat_phase
+
+    @property
+    def beat(self):
+        """
+        True for the block in which a new beat started
+        """
+        return self._beat
+
+    def get_dict(self):
+        return {
+            "timestamp": self._timestamp,
+            "bands": self._bands.tolist(),
+            "rms": self._rms,
+            "flux": self._flux,
+            "onset": self._onset,
+            "tempo": self._tempo,
+            "beat_phase": self._beat_phase,
+            "beat": self._beat,
+        }
+
+
+class FeatureExtractor:
+    """
+    Extracts a fixed set of features from each block of an audio source.
+
+    Band energies are found from a running sum of the squared spectrum at
+    precomputed band edges. Onsets are peaks of the spectral flux above an
+    adaptive threshold. The tempo is the median of recent inter onset
+    intervals folded into a musical range, and the beat phase is a clock at
+    that tempo which is nudged towards detected onsets.
+
+    Keyword Arguments:
+        bands: int - number of log spaced frequency bands
+        frequency_range: tuple - (low, high) edges of the bands in Hz
+        threshold: float - onset threshold as a multiple of the recent mean flux
+        refractory: float - minimum seconds between onsets
+        tempo_range: tuple - (low, high) tempo estimates in beats per minute
+        history: int - number of blocks used for the adaptive threshold
+    """
+
+    def __init__(
+        self,
+        plan,
+        bins,
+        bands=8,
+        frequency_range=(40.0, 16000.0),
+        threshold=1.5,
+        refractory=0.1,
+        tempo_range=(60.0, 180.0),
+        history=64,
+    ):
+        self._threshold = threshold
+        self._refractory = refractory
+        self._period_range = (60 / tempo_range[1], 60 / tempo_range[0])
+
+        # band edges as bin indices, each band covers at least one bin
+        low, high = frequency_range
+        high = min(high, plan.sample_frequency / 2)
+        frequencies = numpy.geomspace(low, high, bands + 1)
+        bin_width = plan.bin_frequency(1) if bins > 1 else 1.0
+        edges = numpy.round(frequencies / bin_width).astype(numpy.intp)
+        edges[0] = max(edges[0], 1)  # skip the dc bin
+        for idx in range(1, len(edges)):
+            edges[idx] = max(edges[idx], edges[idx - 1] + 1)
+        self._edges = numpy.minimum(edges, bins)
+        widths = numpy.diff(self._edges)
+        self._inverse_widths = numpy.where(widths > 0, 1 / numpy.maximum(widths, 1), 0)
+
+        # preallocated scratch space
+        self._squared = numpy.zeros(bins, dtype=numpy.float32)
+        self._running_sum = numpy.zeros(bins + 1, dtype=numpy.float32)
+        self._at_edges = numpy.zeros(bands + 1, dtype=numpy.float32)
+        self._previous = numpy.zeros(bins, dtype=numpy.float32)
+        self._difference = numpy.zeros(bins, dtype=numpy.float32)
+
+        # onset and beat tracking state
+        self._flux_history = deque((), history)
+        self._last_onset = None
+        self._intervals = deque((), 16)
+        self._period = None
+        self._beat_time = None
+
+        self._features = AudioFeatures()
+
+    def process(self, samples, spectrum):
+        """
+        Computes the features of a block and publishes a new snapshot.
+
+        Keyword Arguments:
+            samples: numpy.ndarray - time domain samples of the block
+            spectrum: numpy.ndarray - fft magnitudes of the block
+        """
+        now = time.monotonic()
+        bins = len(self._squared)
+        spectrum = spectrum[:bins]
+
+        # band energies
+        numpy.multiply(spectrum, spectrum, out=self._squared)
+        numpy.cumsum(self._squared, out=self._running_sum[1:])
+        numpy.take(self._running_sum, self._edges, out=self._at_edges)
+        bands = numpy.diff(self._at_edges) * self._inverse_widths
+
+        # loudness
+        rms = math.sqrt(float(numpy.dot(samples, samples)) / max(len(samples), 1))
+
+        # spectral flux counts only increases so that decays are not onsets
+        numpy.subtract(spectrum, self._previous, out=self._difference)
+        numpy.maximum(self._difference, 0, out=self._difference)
+        flux = float(numpy.sum(self._difference)) / max(bins, 1)
+        self._previous[:] = spectrum
+
+        onset = self._detect_onset(now, flux)
+        beat = self._track_beat(now, onset)
+
+        beat_phase = 0.0
+        tempo = None
+        if self._period is not None:
+            tempo = 60 / self._period
+            beat_phase = ((now - self._beat_time) / self._period) % 1.0
+
+        self._features = AudioFeatures(
+            now,
+            bands.astype(numpy.float32),
+            rms,
+            flux,
+            onset,
+            tempo,
+            beat_phase,
+            beat,
+        )
+
+    def _detect_onset(self, now, flux):
+        history = self._flux_history
+        mean = sum(history) / len(history) if len(history) else 0.0
+        history.append(flux)
+
+        if flux <= self._threshold * mean or flux <= 1e-6:
+            return False
+        if self._last_onset is not None and now - self._last_onset < self._refractory:
+            return False
+
+        if self._last_onset is not None:
+            interval = now - self._last_onset
+            if interval < 2 * self._period_range[1]:
+                self._intervals.append(self._fold(interval))
+        self._last_onset = now
+        return True
+
+    def _fold(self, interval):
+        # halve or double an interval until it is in the tempo range
+        shortest, longest = self._period_range
+        while interval > longest:
+            interval /= 2
+        while interval < shortest:
+            interval *= 2
+        return interval
+
+    def _track_beat(self, now, onset):
+        if len(self._intervals) >= 4:
+            self._period = float(numpy.median(self._intervals))
+        if self._period is None:
+            return False
+
+        if self._beat_time is None:
+            self._beat_time = now
+
+        # advance the beat clock
+        beat = False
+        while now - self._beat_time >= self._period:
+            self._beat_time += self._period
+            beat = True
+
+        # pull the clock halfway towards onsets close to a beat
+        if onset:
+            error = now - self._beat_time
+            if error > self._period / 2:
+                error -= self._period
+            if abs(error) < self._period / 4:
+                self._beat_time += error / 2
+
+        return beat
+
+    @property
+    def features(self):
+        return self._features
@@ -67,3 +67,10 @@ class AudioManager:
     @property
     def audio_source(self):
         return self._selected
+
+    @property
+    def features(self):
+        """
+        the latest features of the selected audio source
+        """
+        return self._selected.features
@@ -2,6 +2,7 @@ from audio.fft import FftPlan, reshape, FloatBuffer
 from ..variables.manager import VariableManager
 from ..variables.types import FloatingVariable, IntegerVariable
 from ..variables.responder import VariableResponder
+from .features import FeatureExtractor
 
 
 class AudioSourceFFT:
@@ -24,6 +25,10 @@ class AudioSourceFFT:
     def plan(self):
         return self._plan
 
+    @property
+    def input(self):
+        return self._input_buffer
+
     @property
     def output(self):
         return self._output_buffer
@@ -78,6 +83,11 @@ class ManagedAudioSource(AudioSource):
         self._floor = None
         self._factor = None
 
+        # features are computed once per block and shared by all layers
+        self._feature_extractor = FeatureExtractor(
+            self._fft.plan, len(self._fft.output)
+        )
+
         # create root path
         self._root_path = f"{path}/{self._name}"
 
@@ -152,7 +162,6 @@ class ManagedAudioSource(AudioSource):
             bins_available = reshape(
                 (reshape_factor, 0), self._fft._output_buffer, None
             )
-            bins_available = self._reshaped_fft_bins_available
             if bins_available > self._reshaped_fft_bins_available:
                 bins_available = self._reshaped_fft_bins_available
 
@@ -185,6 +194,7 @@ class ManagedAudioSource(AudioSource):
         reshape(
             reshape_config, self._fft._output_buffer, self._reshaped_fft_output_buffer
         )
+        self._feature_extractor.process(self._buffer.array, self._fft.output.array)
 
     @property
     def variable_manager(self):
@@ -197,3 +207,7 @@ class ManagedAudioSource(AudioSource):
     @property
     def reshaped_fft_output(self):
         return self._reshaped_fft_output
+
+    @property
+    def features(self):
+        return self._feature_extractor.features
@@ -1,7 +1,8 @@
 import pysicgl
+import frameclock
 from cache import Cache
 from .variables.manager import VariableManager
-from .variables.types import FloatingVariable, ColorSequenceVariable
+from .variables.types import FloatingVariable, OptionVariable, ColorSequenceVariable
 
 ALPHA_TRANSPARENCY_NONE = 0x00000000
 ALPHA_TRANSPARENCY_HALF = 0x40000000
@@ -52,6 +53,22 @@ class GlobalsManager:
                 ),
             )
         )
+        # render loop pacing
+        self._variable_manager.declare_variable(
+            FloatingVariable(
+                "framerate",
+                60.0,
+                default_range=(1.0, 120.0),
+                allowed_range=(1.0, 240.0),
+            )
+        )
+        self._variable_manager.declare_variable(
+            OptionVariable(
+                "frame_policy",
+                frameclock.POLICY_DROP,
+                frameclock.policies,
+            )
+        )
         self._variable_manager.initialize_variables()
 
     @property
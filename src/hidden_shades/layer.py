@@ -4,7 +4,9 @@ from cache import Cache
 from .variables.manager import VariableManager
 from .variables.types import OptionVariable, FloatingVariable, ColorSequenceVariable
 from .variables.responder import VariableResponder
+from .worker import LayerWorker
 from pathutils import rmdirr
+from profiling import Metrics
 
 
 class Layer:
@@ -13,6 +15,18 @@ class Layer:
     )[0]
     DEFAULT_COLOR_SEQUENCE_INTERPOLATOR = "CONTINUOUS_CIRCULAR"
 
+    # values which a frame generator may yield to describe the frame it drew
+    # - dynamic: the layer is run every frame
+    # - static: the output only changes when a variable, the palette or the
+    #   layer info changes (or when the layer calls invalidate()). the output
+    #   is cached and the layer is not run again until then.
+    FRAME_DYNAMIC = None
+    FRAME_STATIC = "static"
+
+    # number of times a worker which exited or stopped responding is replaced
+    # before the layer falls back to rendering in this process
+    WORKER_RESTARTS = 3
+
     def __init__(
         self,
         id,
@@ -31,14 +45,53 @@ class Layer:
 
         # reference to the window
         self.window = window
-        self.gpu_environment = gpu_environment
 
-        _, source_texture, _ = gpu_environment["source"]
+        # with layer targets the layer draws into a render target of its own
+        # (it appears as the source in the environment of the layer) so that
+        # it does not have to be composed before the next layer runs
+        source_texture_id, source_texture, source_fbo = gpu_environment["source"]
+        self._target = None
+        if gpu_environment.get("layer_targets"):
+            self._target = gpu_environment["resources"].render_target(
+                source_texture.size
+            )
+            source_texture, source_fbo = self._target
+            gpu_environment = dict(
+                gpu_environment,
+                source=(source_texture_id, source_texture, source_fbo),
+            )
+
+        self.gpu_environment = gpu_environment
         self.source_texture = source_texture
+        self._source_fbo = source_fbo
+
+        # with a render scale other than 1 the layer draws into a scaled
+        # target and canvas of its own, which are resampled into the source
+        self._output_environment = gpu_environment
+        self._interface = interface
+        self._render_size = source_texture.size
+        self._scaled_target = None
+        self._scaled_memory = None
+
+        # gpu objects created by the shard are acquired through this scope so
+        # that they are released with the frame generator
+        self.resources = gpu_environment["resources"].scope()
 
         # default to copying the canvas into the source texture
         self.use_source = False
 
+        # true when the output of the last run is held in the source texture
+        self._source_ready = False
+
+        # time spent on each part of running the layer
+        self.metrics = Metrics()
+
+        # cached output of static layers (allocated on first use)
+        self._cache_texture = None
+        self._cache_fbo = None
+        self._cache_valid = False
+        self._cache_palette = None
+
         # the root path for this layer will not change during its lifetime
         self._root_path = path
         self._vars_path = f"{self._root_path}/vars"
@@ -53,17 +106,26 @@ class Layer:
         self._frame_generator_obj = None
         self._active = False
 
+        # cpu layers may run their frame generator in a worker process
+        self._use_worker = False
+        self._worker_timeout = LayerWorker.TIMEOUT
+        self._worker = None
+        self._worker_restarts = 0
+
         # static info does not change
         self._static_info = {
             "id": self.id,
         }
 
         # variables which may be dynamically registered for external control
-        self._variable_manager = VariableManager(f"{self._root_path}/vars")
+        self._variable_manager = VariableManager(
+            f"{self._root_path}/vars",
+            lambda variable: self._handle_variable_change(variable),
+        )
 
         # declare private variables
         self._private_variable_manager = VariableManager(
-            f"{self._root_path}/private_vars"
+            f"{self._root_path}/private_vars", lambda variable: self.invalidate()
         )
         self._private_variable_responder = VariableResponder(
             lambda variable: self._handle_private_variable_change(variable)
@@ -93,6 +155,15 @@ class Layer:
                 1.0,
             )
         )
+        self._private_variable_manager.declare_variable(
+            FloatingVariable(
+                "render_scale",
+                1.0,
+                default_range=(0.25, 4.0),
+                allowed_range=(0.125, 4.0),
+                responders=[self._private_variable_responder],
+            )
+        )
         self._private_variable_manager.initialize_variables()
 
         # mutable info recorded in a cache
@@ -103,6 +174,8 @@ class Layer:
             "index": None,
             "active": True,
             "use_local_palette": False,
+            "use_worker": False,
+            "worker_timeout": LayerWorker.TIMEOUT,
         }
         if "id" in init_info:
             del init_info["id"]
@@ -120,9 +193,65 @@ class Layer:
         if variable.name == "composition_mode":
             key = self.private_variable_manager.variables["composition_mode"].value
             self._composition_mode = gpu.composition.modes[key]
+        if variable.name == "render_scale":
+            self._set_render_scale(variable.value)
+
+    def _set_render_scale(self, scale):
+        width, height = self.source_texture.size
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        if size == self._render_size:
+            return
+        self._render_size = size
+
+        self._release_scaled_target()
+        if size == self.source_texture.size:
+            self.gpu_environment = self._output_environment
+            self.canvas = self._interface
+        else:
+            self._scaled_target = self.resources.manager.render_target(size)
+            source_texture_id = self._output_environment["source"][0]
+            self.gpu_environment = dict(
+                self._output_environment,
+                source=(source_texture_id, *self._scaled_target),
+            )
+            screen = pysicgl.Screen(size)
+            self._scaled_memory = pysicgl.allocate_pixel_memory(screen.pixels)
+            self.canvas = pysicgl.Interface(screen, self._scaled_memory)
+
+        # shards size their objects after the canvas and source they are given
+        self.invalidate()
+        if self._frame_generator_obj is not None:
+            self.initialize_frame_generator()
+
+    def _release_scaled_target(self):
+        if self._scaled_target is not None:
+            self.resources.manager.recycle(self._scaled_target)
+            self._scaled_target = None
+            self._scaled_memory = None
+
+    def _handle_variable_change(self, variable):
+        self.invalidate()
+        if self._worker is not None:
+            self._worker.update_variable(variable)
 
     def _handle_info_change(self, key, value):
+        self.invalidate()
         self.reset_canvas()
+        if key == "use_worker":
+            use_worker = bool(value)
+            if use_worker != self._use_worker:
+                self._use_worker = use_worker
+                # restart the frame generator in (or out of) a worker
+                if self._frame_generator_obj is not None:
+                    self.initialize_frame_generator()
+            return use_worker
+        if key == "worker_timeout":
+            # layers whose frames legitimately take long may allow more time
+            timeout = float(value)
+            self._worker_timeout = timeout
+            if self._worker is not None:
+                self._worker.timeout = timeout
+            return timeout
         if key == "active":
             active = bool(value)
             self._active = active
@@ -135,32 +264,178 @@ class Layer:
                 self._palette = pysicgl.ColorSequence(l)
                 return l
 
+    def release(self):
+        """
+        Stops the layer and releases the resources it holds
+        """
+        self._stop_worker()
+        self._release_cache()
+        self.resources.release()
+        self._release_scaled_target()
+        if self._target is not None:
+            self.resources.manager.recycle(self._target)
+            self._target = None
+
     def destroy_storage(self):
         """
         Removes the layer information from storage
         """
+        self.release()
         rmdirr(self._root_path)
 
     def initialize_frame_generator(self):
+        self._stop_worker()
+        self._worker_restarts = 0
+
+        # the objects of the previous generator are no longer used
+        if self._frame_generator_obj is not None:
+            self._frame_generator_obj.close()
+        self.resources.release()
+
+        # the generator is always set up in this process so that the variables
+        # it declares are available to the api, even when a worker renders
         self._frame_generator_obj = self._shard.frames(self)
         next(self._frame_generator_obj)
 
+        if self._use_worker:
+            if self.use_source:
+                print(f"Layer {self.id} renders on the gpu and cannot use a worker")
+            else:
+                self._worker = LayerWorker(
+                    self._shard, self, timeout=self._worker_timeout
+                )
+
+    def _stop_worker(self):
+        if self._worker is not None:
+            self._worker.stop()
+            self._worker = None
+
+    def _replace_worker(self):
+        self._stop_worker()
+        while self._worker_restarts < Layer.WORKER_RESTARTS:
+            self._worker_restarts += 1
+            print(f"Layer {self.id} restarting its worker")
+            try:
+                self._worker = LayerWorker(
+                    self._shard, self, timeout=self._worker_timeout
+                )
+                return
+            except Exception as e:
+                print(f"Layer {self.id} worker failed to start: {e}")
+        print(f"Layer {self.id} worker keeps failing, rendering in this process")
+
+    def _collect(self):
+        # gets the next frame from the worker, replacing the worker if it
+        # exited or stopped responding. while the worker has no new frame the
+        # canvas still holds the previous one.
+        self.dispatch()
+        worker = self._worker
+        if worker is None:
+            return next(self._frame_generator_obj)
+        try:
+            return worker.collect(self.canvas.memory)
+        finally:
+            if not worker.alive:
+                self._replace_worker()
+
+    def dispatch(self):
+        """
+        Starts rendering the next frame ahead of run() when the layer uses a
+        worker process. Does nothing for layers which run in this process.
+        """
+        if self._active and self._worker is not None and not self.cached:
+            try:
+                self._worker.dispatch(self.palette)
+            except RuntimeError as e:
+                print(f"Layer {self.id}: {e}")
+                self._replace_worker()
+                self.dispatch()
+
     def set_shard(self, shard):
         self._shard = shard
 
-    def run(self):
+    def run(self, upload=True):
         """
         Gets the next frame from the frame generator object, only if the layer is ready and active
+
+        When upload is False the canvas is not copied into the source texture
+        and the caller is responsible for consuming it (e.g. the single pass
+        compositor stages the canvas memory directly). Layers with a render
+        scale other than 1 always leave their output in the source texture.
         """
         if self._active:
-            next(self._frame_generator_obj)
-
-            if not self.use_source:
+            if self.cached:
+                # the output has not changed, restore it without running the layer
+                # (a layer target still holds the output)
+                if self._target is None:
+                    self.window.ctx.copy_framebuffer(self._source_fbo, self._cache_fbo)
+                self._source_ready = True
+                return
+
+            self._source_ready = self.use_source
+            with self.metrics.time("generator"):
+                if self._worker is not None:
+                    frame = self._collect()
+                else:
+                    frame = next(self._frame_generator_obj)
+
+            if self._scaled_target is not None:
+                # resample the output to the display resolution
+                scaled_texture, _ = self._scaled_target
+                if not self.use_source:
+                    with self.metrics.time("upload"):
+                        scaled_texture.write(self.canvas.memory)
+                with self.metrics.time("resample"):
+                    self.gpu_environment["resampler"].render(
+                        scaled_texture, self._source_fbo
+                    )
+                self._source_ready = True
+            elif upload and not self.use_source:
                 # when the use_source flag is set, the layer is responsible for setting
                 # the contents of the source texture. (e.g. they used a shader to render)
 
                 # copy the canvas layer to the source texture
-                self.source_texture.write(self.canvas.memory)
+                with self.metrics.time("upload"):
+                    self.source_texture.write(self.canvas.memory)
+                self._source_ready = True
+
+            if frame == Layer.FRAME_STATIC:
+                self._store_cache()
+
+    def invalidate(self):
+        """
+        Marks the cached output of a static layer as stale so that the layer
+        is run again on the next frame.
+        """
+        self._cache_valid = False
+
+    def _store_cache(self):
+        if self._target is not None:
+            # nothing else draws into a layer target
+            self._cache_valid = True
+            self._cache_palette = self.palette
+            return
+
+        if self._cache_fbo is None:
+            ctx = self.window.ctx
+            self._cache_texture = ctx.texture(self.source_texture.size, 4)
+            self._cache_fbo = ctx.framebuffer(self._cache_texture)
+
+        if self._source_ready:
+            self.window.ctx.copy_framebuffer(self._cache_fbo, self._source_fbo)
+        else:
+            self._cache_texture.write(self.canvas.memory)
+
+        self._cache_valid = True
+        self._cache_palette = self.palette
+
+    def _release_cache(self):
+        self._cache_valid = False
+        if self._cache_fbo is not None:
+            self._cache_fbo.release()
+            self._cache_texture.release()
+            self._cache_fbo = None
+            self._cache_texture = None
 
     def reset_canvas(self):
         pysicgl.functional.interface_fill(self.canvas, 0x000000)
@@ -181,6 +456,10 @@ class Layer:
     def info(self):
         return dict(**self._info.cache, **self._static_info)
 
+    @property
+    def root_path(self):
+        return self._root_path
+
     @property
     def variable_manager(self):
         return self._variable_manager
@@ -204,6 +483,26 @@ class Layer:
     def active(self):
         return self._active
 
+    @property
+    def cached(self):
+        """
+        True when the layer will reuse its cached output on the next run.
+        """
+        # the palette may be replaced globally without notifying the layer
+        return self._cache_valid and self.palette is self._cache_palette
+
+    @property
+    def source_fbo(self):
+        return self._source_fbo
+
+    @property
+    def source_ready(self):
+        """
+        True when the output of the last run is held in the source texture
+        rather than the canvas.
+        """
+        return self._source_ready
+
     @property
     def brightness(self):
         return self._private_variable_manager.variables["brightness"].value
@@ -1,23 +1,22 @@
-from pathutils import ensure_dirs
+from persistence import writer
 from .responder import VariableResponder
 
 
 class VariableManager(VariableResponder):
-    def __init__(self, path):
+    def __init__(self, path, on_change=None):
         super().__init__(lambda variable: self._handle_variable_change(variable))
         self._path = path
+        self._on_change = on_change
         self._variables = {}
 
-        # ensure filesystem storage exists
-        ensure_dirs(self._path)
-
     def _handle_variable_change(self, variable):
         self._store_variable(variable)
+        if self._on_change is not None:
+            self._on_change(variable)
 
     def _store_variable(self, variable):
         serialized = variable.serialize(variable.value)
-        with open(f"{self._path}/{variable.name}", "w") as f:
-            f.write(serialized)
+        writer.write(f"{self._path}/{variable.name}", serialized)
 
     def declare_variable(self, variable):
         """
@@ -39,8 +38,7 @@ class VariableManager(VariableResponder):
             # try to read the serialized value from memory allowing for it not to exist
             serialized = None
             try:
-                with open(f"{self._path}/{variable.name}", "r") as f:
-                    serialized = str(f.read())
+                serialized = str(writer.read(f"{self._path}/{variable.name}"))
             except OSError:
                 pass
 
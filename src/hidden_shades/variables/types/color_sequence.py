@@ -4,6 +4,24 @@ import pysicgl
 import json
 
 
+def serialize_color_sequence(value):
+    colors = []
+    interpolator_name = ""
+    for color in value:
+        colors.append(color)
+    for name, interpolator in pysicgl.interpolation.__dict__.items():
+        if interpolator == value.interpolator:
+            interpolator_name = name
+
+    return json.dumps({"colors": colors, "interpolator": interpolator_name})
+
+
+def deserialize_color_sequence(ser_value):
+    data = json.loads(ser_value)
+    interpolator = pysicgl.interpolation.__dict__[data["interpolator"]]
+    return pysicgl.ColorSequence(colors=data["colors"], interpolator=interpolator)
+
+
 class ColorSequenceVariable(VariableDeclaration):
     def __init__(self, name, default, **kwargs):
         super().__init__(
@@ -18,17 +36,7 @@ class ColorSequenceVariable(VariableDeclaration):
         return True
 
     def serialize(self, value):
-        colors = []
-        interpolator_name = ""
-        for color in value:
-            colors.append(color)
-        for name, interpolator in pysicgl.interpolation.__dict__.items():
-            if interpolator == value.interpolator:
-                interpolator_name = name
-
-        return json.dumps({"colors": colors, "interpolator": interpolator_name})
+        return serialize_color_sequence(value)
 
     def deserialize(self, ser_value):
-        data = json.loads(ser_value)
-        interpolator = pysicgl.interpolation.__dict__[data["interpolator"]]
-        return pysicgl.ColorSequence(colors=data["colors"], interpolator=interpolator)
+        return deserialize_color_sequence(ser_value)
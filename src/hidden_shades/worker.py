@@ -0,0 +1,312 @@
+import os
+import sys
+import json
+import time
+import socket
+import subprocess
+import traceback
+import importlib.util
+from multiprocessing import shared_memory, resource_tracker
+from multiprocessing.connection import Connection
+import pysicgl
+from .globals import ALPHA_TRANSPARENCY_FULL
+from .variables.manager import VariableManager
+from .variables.types.color_sequence import (
+    serialize_color_sequence,
+    deserialize_color_sequence,
+)
+
+
+class WorkerVariableManager(VariableManager):
+    """
+    Holds the variables of a layer running in a worker process.
+    The values are owned and stored by the main process, which forwards
+    changes to the worker.
+    """
+
+    def _store_variable(self, variable):
+        pass
+
+    def initialize_variables(self):
+        for variable in self._variables.values():
+            variable.notify()
+
+
+class WorkerLayer:
+    """
+    The layer object handed to a frame generator running in a worker process.
+    Only CPU facilities are available: there is no window or gpu environment.
+    """
+
+    # mirrors the frame values of Layer
+    FRAME_DYNAMIC = None
+    FRAME_STATIC = "static"
+
+    def __init__(self, id, path, size):
+        self.id = id
+        self.window = None
+        self.gpu_environment = None
+        self.use_source = False
+
+        screen = pysicgl.Screen(size)
+        self._memory = pysicgl.allocate_pixel_memory(screen.pixels)
+        self.canvas = pysicgl.Interface(screen, self._memory)
+
+        self._variable_manager = WorkerVariableManager(f"{path}/vars")
+        self._palette = None
+
+    def apply(self, updates, palette):
+        variables = self._variable_manager.variables
+        for name, serialized in updates.items():
+            if name in variables:
+                variable = variables[name]
+                variable.value = variable.deserialize(serialized)
+        if palette is not None:
+            self._palette = deserialize_color_sequence(palette)
+
+    @property
+    def memory(self):
+        return self._memory
+
+    @property
+    def variable_manager(self):
+        return self._variable_manager
+
+    @property
+    def palette(self):
+        return self._palette
+
+
+def _load_shard(uuid, source_dir):
+    # the worker imports its own copy of the shard from source
+    spec = importlib.util.spec_from_file_location(
+        f"shards_source.{uuid}", f"{source_dir}/{uuid}.py"
+    )
+    shard = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(shard)
+    return shard
+
+
+def _worker_main(uuid, source_dir, id, path, size, memory_name, conn):
+    try:
+        shard = _load_shard(uuid, source_dir)
+        memory = shared_memory.SharedMemory(name=memory_name)
+        # the main process owns the memory, it must not be unlinked when
+        # this process exits
+        resource_tracker.unregister(memory._name, "shared_memory")
+        layer = WorkerLayer(id, path, tuple(size))
+        nbytes = len(layer.memory)
+
+        generator = shard.frames(layer)
+        next(generator)
+    except Exception as e:
+        traceback.print_exc()
+        conn.send(("error", f"{e}"))
+        return
+    conn.send(("ready", None))
+
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            # the main process has exited
+            break
+        if request is None:
+            break
+
+        updates, palette = request
+        try:
+            layer.apply(updates, palette)
+            pysicgl.functional.interface_fill(
+                layer.canvas, ALPHA_TRANSPARENCY_FULL | 0x000000
+            )
+            frame = next(generator)
+            memory.buf[:nbytes] = layer.memory
+            conn.send(("ok", frame))
+        except Exception as e:
+            traceback.print_exc()
+            conn.send(("error", f"{e}"))
+
+    memory.close()
+
+
+def _worker_entry():
+    # entry point of the worker interpreter, see LayerWorker
+    *args, fd = json.loads(sys.argv[1])
+    _worker_main(*args, Connection(fd))
+
+
+class LayerWorker:
+    """
+    Runs the frame generator of a CPU layer in a worker process.
+
+    The worker renders into its own canvas and copies each finished frame
+    into a shared memory buffer with the same layout as the canvas memory of
+    the layer. Frames are requested with dispatch() and gathered with
+    collect() so that several workers can render at the same time as the
+    rest of the stack.
+
+    Neither starting the worker nor gathering frames waits on the worker, so
+    a slow worker does not hold up the event loop. Until a frame is finished
+    collect() returns FRAME_PENDING and the layer keeps its previous output.
+    A worker which exits, or does not finish a frame within the timeout, is
+    no longer alive and has to be replaced by the layer.
+
+    Keyword Arguments:
+        timeout: float - seconds a frame may take before the worker is
+            considered to have stopped responding
+
+    Notes:
+        Workers are started as new interpreters which import only this
+        module, rather than forked from the main process, which runs other
+        threads and holds a GPU context, sockets and database connections.
+        (multiprocessing would import the main script again in the worker.)
+        The worker imports the shard from its source by uuid, so shard state
+        is not shared with the main process.
+    """
+
+    TIMEOUT = 1.0
+    STARTUP_TIMEOUT = 10.0
+
+    # returned by collect() while the requested frame is not finished
+    FRAME_PENDING = "pending"
+
+    ENTRY = "from hidden_shades.worker import _worker_entry; _worker_entry()"
+
+    def __init__(self, shard, layer, timeout=TIMEOUT):
+        uuid = layer.info.get("shard_uuid")
+        source_dir = os.path.dirname(shard.__file__)
+
+        screen = layer.canvas.screen
+        self._nbytes = len(layer.canvas.memory)
+        self._memory = shared_memory.SharedMemory(create=True, size=self._nbytes)
+
+        parent_socket, child_socket = socket.socketpair()
+        self._conn = Connection(parent_socket.detach())
+        args = [
+            uuid,
+            source_dir,
+            layer.id,
+            layer.root_path,
+            (screen.width, screen.height),
+            self._memory.name,
+            child_socket.fileno(),
+        ]
+        self._process = subprocess.Popen(
+            [sys.executable, "-c", self.ENTRY, json.dumps(args)],
+            pass_fds=(child_socket.fileno(),),
+            env=dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, sys.path))),
+        )
+        child_socket.close()
+
+        # the worker reports when it has set up its frame generator, which
+        # is checked for as frames are dispatched
+        self._started = time.monotonic()
+        self._ready = False
+        self._busy = False
+        self._dispatched = None
+        self._alive = True
+        self._palette = None
+        self.timeout = timeout
+
+        # the worker starts with default values, so send the current state
+        self._pending = {}
+        for variable in layer.variable_manager.variables.values():
+            self.update_variable(variable)
+
+    def update_variable(self, variable):
+        """
+        Queues a variable value to be forwarded with the next frame request.
+        """
+        self._pending[variable.name] = variable.serialize(variable.value)
+
+    def _check_ready(self):
+        # checks whether the worker has started, without waiting for it
+        if self._ready:
+            return True
+        try:
+            if not self._conn.poll(0):
+                if time.monotonic() - self._started > self.STARTUP_TIMEOUT:
+                    self._alive = False
+                    raise RuntimeError("worker did not start in time")
+                return False
+            status, value = self._conn.recv()
+        except (EOFError, OSError):
+            self._alive = False
+            raise RuntimeError("worker process has exited")
+        if status != "ready":
+            self._alive = False
+            raise RuntimeError(f"worker failed to start: {value}")
+        self._ready = True
+        return True
+
+    def dispatch(self, palette):
+        """
+        Requests the next frame without waiting for it.
+        Does nothing while the worker is starting or rendering a frame.
+        """
+        if self._busy or not self._check_ready():
+            return
+
+        serialized_palette = None
+        if palette is not self._palette:
+            self._palette = palette
+            serialized_palette = serialize_color_sequence(palette)
+
+        try:
+            self._conn.send((self._pending, serialized_palette))
+        except OSError:
+            self._alive = False
+            raise RuntimeError("worker process has exited")
+        self._pending = {}
+        self._busy = True
+        self._dispatched = time.monotonic()
+
+    def collect(self, memory):
+        """
+        Copies the requested frame into the given memory if it is finished.
+        Returns the value yielded by the frame generator, or FRAME_PENDING
+        (leaving the memory untouched) when there is no new frame yet.
+        """
+        if not self._busy:
+            return self.FRAME_PENDING
+        if not self._conn.poll(0):
+            if time.monotonic() - self._dispatched > self.timeout:
+                self._alive = False
+                raise TimeoutError("worker did not finish the frame in time")
+            return self.FRAME_PENDING
+
+        try:
+            status, value = self._conn.recv()
+        except (EOFError, OSError):
+            self._alive = False
+            raise RuntimeError("worker process has exited")
+        self._busy = False
+        if status != "ok":
+            raise RuntimeError(f"worker failed to render frame: {value}")
+
+        memory[:] = self._memory.buf[: self._nbytes]
+        return value
+
+    def stop(self):
+        # a worker which stopped responding is not waited for
+        if self._alive:
+            try:
+                self._conn.send(None)
+                self._process.wait(self.TIMEOUT)
+            except (OSError, subprocess.TimeoutExpired):
+                pass
+        if self._process.poll() is None:
+            self._process.kill()
+            self._process.wait()
+        self._conn.close()
+        self._memory.close()
+        self._memory.unlink()
+
+    @property
+    def busy(self):
+        return self._busy
+
+    @property
+    def alive(self):
+        return self._alive
@@ -5,17 +5,23 @@ import socket
 import hidden_shades
 import stack_manager
 import framerate
+import frameclock
+import persistence
 import gpu
+import mapping
 import numpy as np
 import profiling
 import time
 import sys
 import os
+import signal
 import traceback
 import opensimplex
 
 from drivers.artnet import ArtnetDriver
 from drivers.udp import UDPDriver
+from drivers.output import DriverOutput
+from hidden_shades.variables.responder import VariableResponder
 
 from moderngl_window import Timer, weakref, logger
 
@@ -64,17 +70,42 @@ hw_config = cache.Cache(
     {
         "width": 33,
         "height": 32,
+        "headless": False,
+        "compositor": "ping_pong",
+        "render_targets": "shared",
+        "persist_interval": 1.0,
+        "store": "files",
+        "pixel_map": None,
+        "gamma": 1.0,
+        "white_point": None,
+        "dither": True,
     },
 )
 
+# optionally keep all runtime state in a single database instead of one
+# file per value, which makes startup with many layers much faster
+if hw_config.get("store") == "sqlite":
+    persistence.writer.set_store(
+        persistence.SqliteStore(f"{RUNTIME_DIR}/state.db", EPHEMERAL_DIR)
+    )
+
+# from here on changes to stored values are coalesced and written in the
+# background so that the frame loop does not wait on the filesystem
+persistence.writer.start(hw_config.get("persist_interval"))
+
 print("Seeding opensimplex")
 opensimplex.seed(int(time.time()))
 
 drivers = [
     # UDPDriver("0.0.0.0", (6969, 6420)),
+    # UDPDriver("192.168.4.178", (6969, 6420), encoding="delta"),
     # ArtnetDriver("192.168.4.177"),
 ]
 
+# each driver sends from its own thread so that slow or unreachable
+# controllers do not hold up rendering
+outputs = [DriverOutput(driver) for driver in drivers]
+
 # audio sources
 audio_source_root_path = f"{EPHEMERAL_DIR}/audio/sources"
 audio_sources = [
@@ -84,6 +115,14 @@ audio_sources = [
     # UDPAudioSource(
     #     audio_source_root_path, "AudioStreamUDP", ("0.0.0.0", "42310"), (44100, 1024)
     # ),
+    # UDPAudioSource(
+    #     audio_source_root_path,
+    #     "AudioDatagrams",
+    #     ("0.0.0.0", "42312"),
+    #     (44100, 1024),
+    #     hop=512,
+    #     transport="udp",
+    # ),
     # MockAudioSource(audio_source_root_path, "MockAudio", 400, (16000, 256)),
 ]
 
@@ -91,6 +130,8 @@ audio_sources = [
 # create global managers
 artnet_provider = hidden_shades.ArtnetProvider(f"{EPHEMERAL_DIR}/artnet")
 audio_manager = hidden_shades.AudioManager(f"{EPHEMERAL_DIR}/audio")
+hidden_shades.audio_manager = audio_manager  # shared with shards and the api
+hidden_shades.artnet_provider = artnet_provider  # shared with shards
 globals = hidden_shades.GlobalsManager(f"{EPHEMERAL_DIR}/globals")
 
 
@@ -107,10 +148,60 @@ accumulator, accumulator_memory = create_interface(display)
 output, output_memory = create_interface(display)
 
 aspect_ratio = display.width / display.height
-window, timer = gpu.create_window(aspect_ratio=aspect_ratio)
-compositor = gpu.Compositor(ctx=window.ctx, aspect_ratio=aspect_ratio)
-corrector = gpu.Corrector(ctx=window.ctx, aspect_ratio=aspect_ratio)
-gpu_environment = gpu.create_environment(window, (display.width, display.height))
+if hw_config.get("headless"):
+    # render offscreen at the display resolution (no display server needed)
+    window, timer = gpu.create_headless_window((display.width, display.height))
+else:
+    window, timer = gpu.create_window(aspect_ratio=aspect_ratio)
+
+# compiled programs, the full screen quad and layer owned gpu objects are
+# shared through one resource manager
+resources = gpu.ResourceManager(window.ctx)
+compositor = gpu.Compositor(
+    ctx=window.ctx, aspect_ratio=aspect_ratio, resources=resources
+)
+
+# output correction is a property of the leds, so it is part of the hardware
+# config. gamma may be a single exponent or one per channel and the white
+# point is a color temperature in Kelvin.
+color_matrix = None
+if hw_config.get("white_point") is not None:
+    color_matrix = gpu.white_balance(hw_config.get("white_point"))
+corrector = gpu.Corrector(
+    ctx=window.ctx,
+    aspect_ratio=aspect_ratio,
+    gamma=hw_config.get("gamma"),
+    color_matrix=color_matrix,
+    dither=hw_config.get("dither"),
+    resources=resources,
+)
+
+# with "layer" render targets every layer draws into a pooled target of its
+# own, so all layers run before any of them are composed
+layer_targets = hw_config.get("render_targets") == "layer"
+gpu_environment = gpu.create_environment(
+    window, (display.width, display.height), resources, layer_targets
+)
+
+# the single pass compositor folds the whole stack with one draw call
+array_compositor = None
+if hw_config.get("compositor") == "single_pass":
+    array_compositor = gpu.ArrayCompositor(
+        window.ctx, (display.width, display.height), resources=resources
+    )
+readback = gpu.Readback(window.ctx, (display.width, display.height))
+
+# reorder output frames into the physical order of the pixels before they
+# reach the drivers. the layout is read from a CSV or JSON file relative to
+# the persistent directory, or it may be built here, e.g. for two rows of
+# four 8x8 serpentine panels:
+# mapping.tiled(mapping.rows((8, 8), serpentine=True), (8, 8), (4, 2))
+pixel_map = None
+if hw_config.get("pixel_map") is not None:
+    pixel_map = mapping.PixelMap(
+        mapping.load(f"{PERSISTENT_DIR}/{hw_config.get('pixel_map')}"),
+        (display.width, display.height),
+    )
 
 
 # function to load a given shard uuid and return the module
@@ -159,6 +250,26 @@ stack_manager = stack_manager.StackManager(f"{EPHEMERAL_DIR}/stacks", stack_init
 
 frate = framerate.FramerateHistory()
 
+# timings of the stages of the render loop (layers keep their own timings)
+metrics = profiling.Metrics()
+
+# pace the render loop according to the global framerate settings
+frame_clock = frameclock.FrameClock()
+
+
+def handle_frame_clock_variable_change(variable):
+    if variable.name == "framerate":
+        frame_clock.set_frequency(variable.value)
+    if variable.name == "frame_policy":
+        frame_clock.set_policy(variable.value)
+
+
+frame_clock_responder = VariableResponder(handle_frame_clock_variable_change)
+for name in ("framerate", "frame_policy"):
+    variable = globals.variable_manager.variables[name]
+    variable.add_responder(frame_clock_responder)
+    handle_frame_clock_variable_change(variable)
+
 
 async def run_pipeline():
     """
@@ -170,12 +281,18 @@ async def run_pipeline():
         modified and then swapped in)
     - layers: layers represent an atomic step in the generation of the output.
         layers have some metadata as well as a program which generates a frame.
-    - compositor: a gpu shader which composes the layers together
+    - compositor: a gpu shader which composes the layers together. by default
+        each layer is composed as soon as it has run (ping-pong). when the
+        single pass compositor is configured layers are staged into a texture
+        array and the whole stack is composed with a single draw.
 
     Major Resources:
     - window: a moderngl_window window which contains the moderngl context.
+        in headless mode the window is backed by a standalone context and
+        window.fbo is an offscreen framebuffer sized to the display.
     - canvas: working memory for layers. shared between all layers in the stack
-        and cleared between each layer.
+        and cleared between each layer. (layers with a render scale other than
+        1 draw into a canvas of their own)
     - accumulator: memory for accumulating the output of the layers for every
         frame.
     - output: memory for the final output of the pipeline. separation from the
@@ -191,11 +308,16 @@ async def run_pipeline():
         compositor (more or less equivalent to the accumulator) uses ping-pong
         buffering to avoid synchronization issues.
     - framebuffer_texture: (implicit) texture allocated for the window framebuffer.
-        (more or less equivalent to the output)
+        (more or less equivalent to the output) this is window.fbo, which is
+        either the default framebuffer of the window or the offscreen
+        framebuffer of a headless window.
+    - readback: ring of pixel buffer objects used to read the output
+        framebuffer without stalling on the gpu. driver outputs receive a
+        memoryview of the previous frame and copy it for their threads.
 
     """
 
-    source_texture_id, source_texture, _ = gpu_environment["source"]
+    source_texture_id, source_texture, source_fbo = gpu_environment["source"]
     (
         destination_texture_ping_id,
         destination_texture_ping_texture,
@@ -207,36 +329,69 @@ async def run_pipeline():
         destination_fbo_pong,
     ) = gpu_environment["destination_pong"]
 
+    # the output framebuffer is the window framebuffer, or the offscreen
+    # framebuffer when running headless
+    output_fbo = window.fbo
+
     # if ping is true then render to ping, else render to pong
     ping = True
 
-    # make a timer for profiling the framerate
-    profiler = profiling.ProfileTimer()
+    # single pass composition stages layers and composes them at the end
+    single_pass = array_compositor is not None
 
-    # rate-limit the output
-    output_event = asyncio.Event()
+    def compose(layer):
+        with layer.metrics.time("composite"):
+            composite(layer)
 
-    def current_milli_time():
-        return round(time.time() * 1000)
+    def composite(layer):
+        nonlocal ping
 
-    async def rate_limiter(frequency):
-        period_ms = 1000 / frequency
+        if single_pass:
+            # stage the layer output for composition at the end of the frame
+            if layer.source_ready:
+                array_compositor.stage_framebuffer(
+                    layer.source_fbo, layer.composition_mode, layer.brightness
+                )
+            else:
+                array_compositor.stage_memory(
+                    layer.canvas.memory, layer.composition_mode, layer.brightness
+                )
+            return
+
+        # compose the source texture onto the destination texture
+        # (a layer target is bound in place of the shared source texture)
+        if layer_targets:
+            layer.source_texture.use(location=source_texture_id)
+        if ping == True:
+            ping = False
+            destination_fbo_ping.use()
+        else:
+            ping = True
+            destination_fbo_pong.use()
+
+        compositor.render(
+            source=source_texture_id,
+            destination=(
+                destination_texture_ping_id if ping else destination_texture_pong_id
+            ),
+            mode=layer.composition_mode,
+            brightness=layer.brightness,
+        )
 
-        next_frame_ms = current_milli_time() + period_ms
-        while True:
-            # wait for next time
-            while current_milli_time() < next_frame_ms:
-                await asyncio.sleep(0)
+    # audio data shared with shader layers
+    audio_texture = gpu_environment["audio_texture"]
 
-            # signal
-            output_event.set()
-            next_frame_ms += period_ms
+    # make timers for profiling the frame draw time and the frame period
+    profiler = profiling.ProfileTimer()
+    period = profiling.ProfileTimer()
 
-    # Start a task to control the output rate
-    FRAMERATE = 60
-    asyncio.create_task(rate_limiter(FRAMERATE))
+    # frames are counted here since headless windows never swap buffers
+    # (and so do not count frames)
+    frames = 0
 
     timer.start()
+    frame_clock.reset()
+    period.set()
 
     while not window.is_closing:
         current_time, delta = timer.next_frame()
@@ -252,6 +407,20 @@ async def run_pipeline():
         destination_fbo_ping.clear(0.0, 0.0, 0.0, 0.0)
         destination_fbo_pong.clear(0.0, 0.0, 0.0, 0.0)
 
+        if single_pass:
+            array_compositor.begin(
+                sum(1 for layer in stack_manager.active if layer.active)
+            )
+
+        # upload the latest audio block, if any, before layers sample it
+        with metrics.time("audio"):
+            audio_texture.update(audio_manager.audio_source)
+
+        # start layers which run in worker processes so that they render
+        # alongside the rest of the stack
+        for layer in stack_manager.active:
+            layer.dispatch()
+
         # loop over all layers in the active stack manager
         layer_idx = 0
         debug("Running layer: ", end="")
@@ -265,75 +434,91 @@ async def run_pipeline():
                 # zero the layer interface for each shard
                 # (if a layer wants to use persistent memory it can do whacky stuff
                 # such as allocating its own local interface and copying out the results)
-                pysicgl.functional.interface_fill(
-                    canvas, hidden_shades.globals.ALPHA_TRANSPARENCY_FULL | 0x000000
-                )
+                # layers which reuse their cached output do not touch the canvas
+                if not layer.cached:
+                    pysicgl.functional.interface_fill(
+                        layer.canvas,
+                        hidden_shades.globals.ALPHA_TRANSPARENCY_FULL | 0x000000,
+                    )
 
                 # run the layer
+                # (the single pass compositor stages the canvas itself, but
+                # layer targets must hold the output since the canvas is reused)
                 try:
-                    layer.run()
+                    layer.run(upload=layer_targets or not single_pass)
                 except Exception as e:
                     print(f"Exception in layer {layer.id}: {e}")
                     traceback.print_exc()
                     # layer.set_active(False)
 
-                # compose the source texture onto the destination texture
-                if ping == True:
-                    ping = False
-                    destination_fbo_ping.use()
-                else:
-                    ping = True
-                    destination_fbo_pong.use()
-
-                compositor.render(
-                    source=source_texture_id,
-                    destination=(
-                        destination_texture_ping_id
-                        if ping
-                        else destination_texture_pong_id
-                    ),
-                    mode=layer.composition_mode,
-                    brightness=layer.brightness,
-                )
+                # with layer targets composition waits until all layers ran
+                if not layer_targets:
+                    compose(layer)
             debug(", ", end="")
 
         debug("")
 
-        # apply corrections
-        window.ctx.screen.use()
-        corrector.render(
-            destination=(
+        if layer_targets:
+            for layer in stack_manager.active:
+                if layer.active and layer.source_ready:
+                    compose(layer)
+
+        # select the texture holding the composed stack
+        if single_pass:
+            with metrics.time("composite"):
+                destination_fbo_ping.use()
+                array_compositor.render()
+            destination = destination_texture_ping_id
+        else:
+            destination = (
                 destination_texture_ping_id if not ping else destination_texture_pong_id
-            ),
-            # brightness=globals.variable_manager.variables["brightness"].value,
-            brightness=1.0,
-        )
+            )
+
+        # apply corrections
+        with metrics.time("correction"):
+            output_fbo.use()
+            corrector.render(
+                destination=destination,
+                brightness=globals.variable_manager.variables["brightness"].value,
+            )
 
         # output the display data to the window
-        if not window.is_closing:
+        # (headless windows have nothing to present so the swap is skipped)
+        if not window.headless and not window.is_closing:
             # texture.write(output_memory)
             window.swap_buffers()
 
-        # output the framebuffer data to the drivers
-        data = window.ctx.screen.read(viewport=(0, 0, display.width, display.height))
-        for driver in drivers:
-            driver.push(data)
-
-        # compute framerate
+        # hand the framebuffer data to the driver outputs
+        # (the readback is asynchronous so the data is from the previous frame)
+        with metrics.time("readback"):
+            data = readback.read(output_fbo)
+        if data is not None:
+            if pixel_map is not None:
+                with metrics.time("pixel_map"):
+                    data = pixel_map.apply(data)
+            with metrics.time("submit"):
+                for output in outputs:
+                    output.submit(data)
+
+        # record the frame draw time
         profiler.mark()
-        frate.record_period_ms(profiler.period_ms)
+        metrics.record("frame", profiler.period_ms)
 
         # wait for the next output opportunity
-        await output_event.wait()
-        output_event.clear()
+        await frame_clock.wait()
+
+        # compute framerate from the time between the starts of frames
+        period.mark()
+        period.set()
+        metrics.record("period", period.period_ms)
+        frate.record_period_ms(period.period_ms)
+        frames += 1
 
     _, duration = timer.stop()
     window.destroy()
     if duration > 0:
         logger.info(
-            "Duration: {0:.2f}s @ {1:.2f} FPS".format(
-                duration, window.frames / duration
-            )
+            "Duration: {0:.2f}s @ {1:.2f} FPS".format(duration, frames / duration)
         )
 
     loop = asyncio.get_running_loop()
@@ -352,6 +537,8 @@ async def serve_api():
         globals=globals,
         window=window,
         gpu_environment=gpu_environment,
+        outputs=outputs,
+        metrics=metrics,
     )
 
     # set up server
@@ -409,7 +596,14 @@ async def control_visualizer():
 async def blink():
     while True:
         await asyncio.sleep(5)
-        print(f"{frate.average()} fps, ({len(stack_manager.active)} layers)")
+        stats = frame_clock.stats
+        frame = metrics.history("frame").stats
+        print(
+            f"{frate.average()} fps, ({len(stack_manager.active)} layers), "
+            f"frame p95 {frame.get('p95', 0.0):.2f}ms, "
+            f"target {stats['frequency']} fps, missed {stats['missed']}, "
+            f"dropped {stats['dropped']}, jitter {stats['jitter_ms']['mean']:.2f}ms"
+        )
 
 
 async def main():
@@ -420,6 +614,10 @@ async def main():
     asyncio.create_task(blink())
     asyncio.create_task(artnet_provider.run())
 
+    # start driver outputs
+    for output in outputs:
+        output.start()
+
     # start audio sources
     for source in audio_sources:
         print("Initializing audio source: ", source)
@@ -434,5 +632,13 @@ async def main():
         await asyncio.sleep(1)
 
 
+# exit normally on SIGTERM so that pending writes are flushed
+signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
 # run asyncio scheduler
-asyncio.run(main())
+try:
+    asyncio.run(main())
+finally:
+    for output in outputs:
+        output.stop()
+    persistence.writer.stop()
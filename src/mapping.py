@@ -0,0 +1,228 @@
+import csv
+import json
+import numpy
+
+# a layout is an array of (x, y) display coordinates with one row per
+# physical pixel in the order the pixels are wired. (-1, -1) marks a gap:
+# a physical pixel which does not show part of the display and stays dark.
+GAP = (-1, -1)
+
+
+def _coordinates(xs, ys):
+    return numpy.stack((xs, ys), axis=-1).reshape(-1, 2).astype(numpy.intp)
+
+
+def rows(size, serpentine=False, reverse_first=False):
+    """
+    Returns the layout of a panel wired row by row from the top left.
+
+    Keyword Arguments:
+        serpentine: bool - every other row runs in the opposite direction
+        reverse_first: bool - the first row runs from right to left
+    """
+    width, height = size
+    ys, xs = numpy.mgrid[0:height, 0:width]
+    reversed_rows = numpy.zeros(height, dtype=bool)
+    if serpentine:
+        reversed_rows[1::2] = True
+    if reverse_first:
+        reversed_rows = ~reversed_rows
+    xs[reversed_rows] = xs[reversed_rows, ::-1]
+    return _coordinates(xs, ys)
+
+
+def columns(size, serpentine=False, reverse_first=False):
+    """
+    Returns the layout of a panel wired column by column from the top left.
+
+    Keyword Arguments:
+        serpentine: bool - every other column runs in the opposite direction
+        reverse_first: bool - the first column runs from bottom to top
+    """
+    width, height = size
+    layout = rows((height, width), serpentine, reverse_first)
+    return layout[:, ::-1].copy()
+
+
+def rotate(layout, size, turns):
+    """
+    Rotates a layout of the given size by quarter turns clockwise.
+    Returns the rotated layout and its size.
+    """
+    width, height = size
+    layout = layout.copy()
+    gaps = numpy.all(layout == GAP, axis=1)
+    for _ in range(turns % 4):
+        xs = layout[:, 0].copy()
+        layout[:, 0] = height - 1 - layout[:, 1]
+        layout[:, 1] = xs
+        width, height = height, width
+    layout[gaps] = GAP
+    return layout, (width, height)
+
+
+def mirror(layout, size):
+    """
+    Mirrors a layout of the given size left to right.
+    """
+    width, _ = size
+    layout = layout.copy()
+    gaps = numpy.all(layout == GAP, axis=1)
+    layout[:, 0] = width - 1 - layout[:, 0]
+    layout[gaps] = GAP
+    return layout
+
+
+def offset(layout, origin):
+    """
+    Moves a layout so that its top left corner is at origin.
+    """
+    layout = layout.copy()
+    gaps = numpy.all(layout == GAP, axis=1)
+    layout += numpy.asarray(origin, dtype=numpy.intp)
+    layout[gaps] = GAP
+    return layout
+
+
+def gap(count):
+    """
+    Returns a layout of unused physical pixels.
+    """
+    return numpy.full((count, 2), GAP, dtype=numpy.intp)
+
+
+def chain(*layouts):
+    """
+    Joins layouts which are wired one after another.
+    """
+    return numpy.concatenate(layouts).astype(numpy.intp)
+
+
+def tiled(panel, panel_size, grid, serpentine=False):
+    """
+    Returns the layout of identical panels arranged in a grid and chained
+    row by row from the top left.
+
+    Keyword Arguments:
+        panel: numpy.ndarray - layout of a single panel
+        panel_size: tuple - (width, height) of a panel
+        grid: tuple - (columns, rows) of panels
+        serpentine: bool - every other row of panels is chained right to left
+    """
+    panel_width, panel_height = panel_size
+    grid_columns, grid_rows = grid
+    tiles = []
+    for row in range(grid_rows):
+        order = range(grid_columns)
+        if serpentine and row % 2:
+            order = reversed(order)
+        for column in order:
+            tiles.append(offset(panel, (column * panel_width, row * panel_height)))
+    return chain(*tiles)
+
+
+def load(path):
+    """
+    Reads a layout from a JSON or CSV file.
+
+    JSON files hold a list with an [x, y] pair or null for each physical
+    pixel. CSV files hold an x, y row for each physical pixel where empty
+    or negative coordinates are gaps.
+    """
+    if path.endswith(".json"):
+        with open(path) as f:
+            entries = json.load(f)
+        return numpy.array(
+            [GAP if entry is None else entry for entry in entries], dtype=numpy.intp
+        ).reshape(-1, 2)
+
+    layout = []
+    with open(path, newline="") as f:
+        for row in csv.reader(f):
+            values = [value.strip() for value in row]
+            if len(values) < 2 or "" in values[:2]:
+                layout.append(GAP)
+                continue
+            try:
+                layout.append((int(values[0]), int(values[1])))
+            except ValueError:
+                # allow a header row
+                if len(layout):
+                    raise
+    return numpy.array(layout, dtype=numpy.intp).reshape(-1, 2)
+
+
+class PixelMap:
+    """
+    Reorders frames from display order into the physical order of the pixels.
+
+    The layout is compiled into a lookup table with the source byte for every
+    output byte, so remapping a frame is a single gather no matter how
+    complex the layout is. Coordinates outside of the display are treated
+    as gaps.
+
+    Keyword Arguments:
+        components: int - bytes per pixel of the frames
+    """
+
+    def __init__(self, layout, size, components=3):
+        width, height = size
+        layout = numpy.asarray(layout, dtype=numpy.intp).reshape(-1, 2)
+        xs = layout[:, 0]
+        ys = layout[:, 1]
+        valid = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+
+        # gaps read from a zeroed pixel placed after the frame
+        frame_pixels = width * height
+        pixels = numpy.where(valid, ys * width + xs, frame_pixels)
+        self._lut = (
+            pixels[:, numpy.newaxis] * components + numpy.arange(components)
+        ).reshape(-1)
+
+        self._has_gaps = not numpy.all(valid)
+        self._frame_length = frame_pixels * components
+        self._source = numpy.zeros(self._frame_length + components, dtype=numpy.uint8)
+        self._output = numpy.zeros(len(self._lut), dtype=numpy.uint8)
+        self._view = memoryview(self._output)
+
+        self._size = (width, height)
+        self._components = components
+        self._pixels = len(layout)
+
+    def apply(self, frame, out=None):
+        """
+        Returns a memoryview of the remapped frame.
+
+        Keyword Arguments:
+            out: numpy.ndarray - uint8 array to write the output to instead
+                of the memory owned by the map
+
+        Notes:
+            Unless out is given the result refers to memory that is reused
+            by the next call.
+        """
+        source = numpy.frombuffer(frame, dtype=numpy.uint8)
+        if len(source) != self._frame_length:
+            raise ValueError("frame does not match the size of the pixel map")
+
+        if self._has_gaps:
+            self._source[: self._frame_length] = source
+            source = self._source
+
+        if out is None:
+            numpy.take(source, self._lut, out=self._output)
+            return self._view
+        numpy.take(source, self._lut, out=out)
+        return memoryview(out)
+
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def components(self):
+        return self._components
+
+    @property
+    def pixels(self):
+        return self._pixels
@@ -1,4 +1,5 @@
 import os
+from persistence import writer
 
 
 def ensure_dirs(path, offset=0):
@@ -27,6 +28,13 @@ def rmdirr(dir):
     Recursively remove directory.
     Will delete everything inside.
     """
+    # pending writes would otherwise recreate files after removal
+    writer.discard(dir)
+
+    # storage which is not kept in files has no directory
+    if not os.path.exists(dir):
+        return
+
     for root, dirs, files in os.walk(dir, topdown=False):
         for name in files:
             os.remove(os.path.join(root, name))
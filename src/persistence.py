@@ -0,0 +1,369 @@
+import os
+import sqlite3
+import threading
+
+
+def write_atomic(path, content):
+    """
+    Write a file so that readers see either the old or the new contents,
+    never a partially written file.
+    """
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+
+class FileStore:
+    """
+    Stores each path as a file of its own.
+
+    Directories are created when the first file inside of them is written.
+    """
+
+    def __init__(self):
+        # directories known to exist
+        self._directories = set()
+
+    def _ensure_parent_dirs(self, path):
+        directory = os.path.dirname(path)
+        if directory and directory not in self._directories:
+            os.makedirs(directory, exist_ok=True)
+            self._directories.add(directory)
+
+    def owns(self, path):
+        return True
+
+    def read(self, path):
+        with open(path, "r") as f:
+            return f.read()
+
+    def write_many(self, items):
+        for path, content in items:
+            try:
+                self._ensure_parent_dirs(path)
+                write_atomic(path, content)
+            except OSError as e:
+                print(f"failed to store {path}: {e}")
+
+    def remove(self, root):
+        # the files are removed along with their directories
+        prefix = f"{root}/"
+        self._directories = set(
+            directory
+            for directory in self._directories
+            if directory != root and not directory.startswith(prefix)
+        )
+
+    def list(self, path):
+        # directories are only created once something is stored in them
+        try:
+            return os.listdir(path)
+        except FileNotFoundError:
+            return []
+
+    def exists(self, path):
+        return os.path.exists(path)
+
+
+class SqliteStore:
+    """
+    Stores every path below a root directory in a single SQLite database.
+
+    All entries are loaded in one query when the store is opened and are
+    served from memory afterwards, so startup does not open one file per
+    layer and variable. Writes are applied in a single transaction per flush.
+    Directories are implied by the paths of the entries and are indexed so
+    that listing them does not scan every entry.
+
+    When the database is created, files which already exist below the root
+    are imported so that switching stores keeps the current state.
+
+    Keyword Arguments:
+        root: str - directory whose paths are kept in the database
+    """
+
+    def __init__(self, db_path, root):
+        self._root = root
+        self._prefix = f"{root}/"
+        self._lock = threading.Lock()
+
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS entries "
+            "(path TEXT PRIMARY KEY, content TEXT NOT NULL)"
+        )
+        self._entries = dict(
+            self._connection.execute("SELECT path, content FROM entries")
+        )
+
+        # names directly inside each directory which holds entries
+        self._children = {}
+        for path in self._entries.keys():
+            self._add_path(path)
+
+        if len(self._entries) == 0:
+            self._import_files()
+
+    def _import_files(self):
+        items = []
+        for directory, _, files in os.walk(self._root):
+            for name in files:
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(directory, name)
+                with open(path, "r") as f:
+                    items.append((path, f.read()))
+        self.write_many(items)
+
+    def _add_path(self, path):
+        # records the path in the directories above it, up to the root
+        while path.startswith(self._prefix):
+            directory, name = path.rsplit("/", 1)
+            children = self._children.setdefault(directory, set())
+            if name in children:
+                return
+            children.add(name)
+            path = directory
+
+    def _remove_path(self, path):
+        # forgets the path and the directories which are left empty
+        while path.startswith(self._prefix):
+            directory, name = path.rsplit("/", 1)
+            children = self._children.get(directory)
+            if children is None:
+                return
+            children.discard(name)
+            if len(children) or directory in self._entries:
+                return
+            del self._children[directory]
+            path = directory
+
+    def owns(self, path):
+        return path.startswith(self._prefix)
+
+    def read(self, path):
+        with self._lock:
+            if path not in self._entries:
+                raise FileNotFoundError(f"no stored entry for {path}")
+            return self._entries[path]
+
+    def write_many(self, items):
+        items = list(items)
+        with self._lock:
+            for path, _ in items:
+                if path not in self._entries:
+                    self._add_path(path)
+            self._entries.update(items)
+        try:
+            with self._connection:
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO entries (path, content) VALUES (?, ?)",
+                    items,
+                )
+        except sqlite3.Error as e:
+            print(f"failed to store {len(items)} entries: {e}")
+
+    def remove(self, root):
+        prefix = f"{root}/"
+        with self._lock:
+            for path in list(self._entries.keys()):
+                if path == root or path.startswith(prefix):
+                    del self._entries[path]
+            for directory in list(self._children.keys()):
+                if directory == root or directory.startswith(prefix):
+                    del self._children[directory]
+            self._remove_path(root)
+        with self._connection:
+            self._connection.execute(
+                "DELETE FROM entries WHERE path = ? OR substr(path, 1, ?) = ?",
+                (root, len(prefix), prefix),
+            )
+
+    def list(self, path):
+        """
+        Returns the names of the entries and directories directly inside a path.
+        """
+        with self._lock:
+            return list(self._children.get(path, ()))
+
+    def exists(self, path):
+        with self._lock:
+            return path in self._entries or path in self._children
+
+    def close(self):
+        self._connection.close()
+
+
+class WriteBehind:
+    """
+    Coalesces file writes and flushes them from a background thread.
+
+    Writes are recorded in memory, replacing any pending contents for the same
+    path, and are written to disk with an atomic rename once per interval.
+    This keeps filesystem latency out of the frame loop when values change
+    many times per second (for example while a slider is dragged).
+
+    Until start() is called writes go straight to disk, so tools which use
+    the storage classes without a running writer keep working unchanged.
+
+    Paths are kept in individual files unless a store which owns them has
+    been configured with set_store().
+
+    Notes:
+        Pending contents are visible through read() before they are flushed.
+        Storage which is about to be removed must be discarded first so that
+        a later flush does not recreate it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = {}
+        self._flushing = {}
+
+        self._files = FileStore()
+        self._store = None
+
+        self._interval = None
+        self._thread = None
+        self._wake = threading.Event()
+        self._stopping = False
+
+    def set_store(self, store):
+        """
+        Keeps the paths owned by the given store in that store rather than in
+        individual files. Pending writes are flushed first.
+        """
+        self.flush()
+        with self._flush_lock:
+            self._store = store
+
+    def _route(self, path):
+        if self._store is not None and self._store.owns(path):
+            return self._store
+        return self._files
+
+    def write(self, path, content):
+        if self._thread is None:
+            with self._flush_lock:
+                self._route(path).write_many(((path, content),))
+            return
+
+        with self._lock:
+            self._pending[path] = content
+
+    def read(self, path):
+        """
+        Returns the contents of a file, including writes not yet flushed.
+        Raises the same errors as open() when there is no such file.
+        """
+        with self._lock:
+            if path in self._pending:
+                return self._pending[path]
+            if path in self._flushing:
+                return self._flushing[path]
+
+        return self._route(path).read(path)
+
+    def list(self, path):
+        """
+        Returns the names inside a directory, like os.listdir().
+        """
+        return self._route(path).list(path)
+
+    def exists(self, path):
+        """
+        Returns whether a file or directory exists, like os.path.exists().
+        """
+        prefix = f"{path}/"
+        with self._lock:
+            for pending in (self._pending, self._flushing):
+                for entry in pending.keys():
+                    if entry == path or entry.startswith(prefix):
+                        return True
+        return self._route(path).exists(path)
+
+    def discard(self, root):
+        """
+        Removes the stored contents for a path and everything below it,
+        including pending writes.
+        Waits for an ongoing flush so that nothing is written afterwards.
+        """
+        prefix = f"{root}/"
+        with self._flush_lock:
+            with self._lock:
+                for path in list(self._pending.keys()):
+                    if path == root or path.startswith(prefix):
+                        del self._pending[path]
+            self._route(root).remove(root)
+
+    def flush(self):
+        """
+        Writes all pending contents to disk.
+        """
+        with self._flush_lock:
+            with self._lock:
+                self._flushing, self._pending = self._pending, {}
+
+            routed = {}
+            for path, content in self._flushing.items():
+                routed.setdefault(self._route(path), []).append((path, content))
+            for store, items in routed.items():
+                store.write_many(items)
+
+            with self._lock:
+                self._flushing = {}
+
+    def start(self, interval):
+        """
+        Starts flushing pending writes every interval seconds.
+        """
+        self.set_interval(interval)
+        if self._thread is not None:
+            return
+
+        self._stopping = False
+        self._thread = threading.Thread(
+            target=self._run, name="write-behind", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops the background thread and flushes any remaining writes.
+        """
+        if self._thread is not None:
+            self._stopping = True
+            self._wake.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def set_interval(self, interval):
+        interval = float(interval)
+        if interval <= 0:
+            raise ValueError(f"invalid flush interval {interval}")
+        self._interval = interval
+        self._wake.set()
+
+    def _run(self):
+        while not self._stopping:
+            self._wake.wait(self._interval)
+            self._wake.clear()
+            self.flush()
+
+    @property
+    def interval(self):
+        return self._interval
+
+    @property
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+
+# the writer shared by all storage in the process
+writer = WriteBehind()
@@ -1,4 +1,5 @@
 import time
+import numpy
 
 
 def current_micros_time():
@@ -34,3 +35,119 @@ def timed(f, *args, **kwargs):
         return result
 
     return inner
+
+
+class TimingHistory:
+    """
+    Keeps the most recent durations in a fixed size ring buffer.
+
+    Recording a duration writes one slot and never allocates, so histories
+    may be updated in the render loop. Summary statistics are computed when
+    they are requested.
+
+    Keyword Arguments:
+        capacity: int - number of durations kept
+    """
+
+    def __init__(self, capacity=300):
+        self._samples = numpy.zeros(capacity)
+        self._index = 0
+        self._count = 0
+        self._last = None
+
+    def record(self, period_ms):
+        self._samples[self._index] = period_ms
+        self._index = (self._index + 1) % len(self._samples)
+        if self._count < len(self._samples):
+            self._count += 1
+        self._last = period_ms
+
+    def reset(self):
+        self._index = 0
+        self._count = 0
+        self._last = None
+
+    @property
+    def stats(self):
+        """
+        Summary of the recorded durations in milliseconds.
+        """
+        if self._count == 0:
+            return {"count": 0}
+        samples = self._samples[: self._count]
+        p50, p95, p99 = numpy.percentile(samples, (50, 95, 99))
+        return {
+            "count": self._count,
+            "last": self._last,
+            "mean": float(samples.mean()),
+            "max": float(samples.max()),
+            "p50": float(p50),
+            "p95": float(p95),
+            "p99": float(p99),
+        }
+
+
+class _Measurement:
+    # context manager which records the time spent in its block
+    def __init__(self, history):
+        self._history = history
+
+    def __enter__(self):
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *args):
+        self._history.record((time.perf_counter_ns() - self._start) / 1e6)
+
+
+class Metrics:
+    """
+    A set of named timing histories.
+
+    Blocks of code are timed with:
+        with metrics.time("name"):
+            ...
+
+    Keyword Arguments:
+        capacity: int - number of durations kept for each name
+
+    Notes:
+        A name should be timed by one thread at a time and its blocks must
+        not be nested.
+    """
+
+    def __init__(self, capacity=300):
+        self._capacity = capacity
+        self._histories = {}
+        self._measurements = {}
+
+    def history(self, name):
+        """
+        Returns the history for a name, creating it if needed.
+        """
+        history = self._histories.get(name)
+        if history is None:
+            history = TimingHistory(self._capacity)
+            self._histories[name] = history
+        return history
+
+    def record(self, name, period_ms):
+        self.history(name).record(period_ms)
+
+    def time(self, name):
+        """
+        Returns a context manager which records the duration of its block.
+        """
+        measurement = self._measurements.get(name)
+        if measurement is None:
+            measurement = _Measurement(self.history(name))
+            self._measurements[name] = measurement
+        return measurement
+
+    def reset(self):
+        for history in self._histories.values():
+            history.reset()
+
+    @property
+    def stats(self):
+        return {name: history.stats for name, history in self._histories.items()}
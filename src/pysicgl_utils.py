@@ -1,3 +1,32 @@
+import numpy
+import pysicgl
+
+
+def scalar_field(array):
+    """
+    Creates a pysicgl ScalarField from an array of per-pixel values.
+    The array may have any shape as long as it is in pixel (row major) order.
+    """
+    values = numpy.asarray(array, dtype=float).ravel()
+    return pysicgl.ScalarField(values.tolist())
+
+
+def blit_rgb(interface, rgb, alpha=0x7F):
+    """
+    Copies (r, g, b) rows of an array into the pixels of an interface in
+    pixel order. Extra rows are ignored and missing pixels are left untouched.
+
+    Keyword Arguments:
+        alpha: int - alpha of the written pixels, opaque by default
+            (matching ALPHA_TRANSPARENCY_FULL)
+    """
+    # pixels are stored as little endian 0xAARRGGBB, so bytes are b, g, r, a
+    pixels = numpy.frombuffer(interface.memory, dtype=numpy.uint8).reshape(-1, 4)
+    n = min(len(rgb), len(pixels))
+    pixels[:n, 2::-1] = rgb[:n]
+    pixels[:n, 3] = alpha
+
+
 class Display:
     def __init__(self, screen):
         self._screen = screen
@@ -23,6 +52,16 @@ class Display:
             self._dimy / self._unity,
         )  # shape of the display normalized so that the maximum element is 1.0
 
+        # coordinate arrays are computed on first use and then shared
+        self._indices = None
+        self._coordinates = None
+        self._positions = None
+
+        # only the most recently requested center is kept so that moving
+        # centers do not accumulate arrays
+        self._centered = (None, None)
+        self._polar = (None, None)
+
     @property
     def extent(self):
         return self._extent
@@ -37,7 +76,7 @@ class Display:
 
     @property
     def center(self):
-        (extx, exty) = self.shape
+        extx, exty = self.shape
         return (extx / 2, exty / 2)
 
     def pixel_info(self):
@@ -60,3 +99,82 @@ class Display:
             pos = (u / dimu, v / dimv)
 
             yield (idx, coords, pos)
+
+    @staticmethod
+    def _freeze(array):
+        array.flags.writeable = False
+        return array
+
+    @property
+    def indices(self):
+        """
+        the index of each pixel as a flat array in pixel order
+        """
+        if self._indices is None:
+            self._indices = self._freeze(numpy.arange(self._screen.pixels))
+        return self._indices
+
+    @property
+    def coordinates(self):
+        """
+        a tuple (u, v) of flat integer arrays holding the column and row of each pixel
+        """
+        if self._coordinates is None:
+            u, v = numpy.divmod(self.indices, self._screen.width)[::-1]
+            self._coordinates = (self._freeze(u), self._freeze(v))
+        return self._coordinates
+
+    @property
+    def positions(self):
+        """
+        a tuple (x, y) of flat float arrays holding the normalized position of each
+        pixel, matching the positions yielded by pixel_info()
+        """
+        if self._positions is None:
+            dimu, dimv = self._dimensions
+            if dimu == 0:
+                dimu = 1
+            if dimv == 0:
+                dimv = 1
+
+            u, v = self.coordinates
+            self._positions = (self._freeze(u / dimu), self._freeze(v / dimv))
+        return self._positions
+
+    def centered(self, center=None):
+        """
+        returns a tuple (dx, dy) of the pixel positions relative to a center point
+
+        Keyword Arguments:
+            center: tuple - the point to measure from, defaults to the display center
+        """
+        if center is None:
+            center = self.center
+        center = (float(center[0]), float(center[1]))
+
+        if self._centered[0] != center:
+            x, y = self.positions
+            arrays = (self._freeze(x - center[0]), self._freeze(y - center[1]))
+            self._centered = (center, arrays)
+        return self._centered[1]
+
+    def polar(self, center=None):
+        """
+        returns a tuple (r, theta) of the pixel positions in polar coordinates
+        around a center point
+
+        Keyword Arguments:
+            center: tuple - the origin of the coordinates, defaults to the display center
+        """
+        if center is None:
+            center = self.center
+        center = (float(center[0]), float(center[1]))
+
+        if self._polar[0] != center:
+            dx, dy = self.centered(center)
+            arrays = (
+                self._freeze(numpy.hypot(dx, dy)),
+                self._freeze(numpy.arctan2(dy, dx)),
+            )
+            self._polar = (center, arrays)
+        return self._polar[1]
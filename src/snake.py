@@ -1,5 +1,6 @@
+import numpy
 import pysicgl
-import seasnake
+from mapping import PixelMap, rows
 
 
 class SimpleSnakeArrangement:
@@ -14,13 +15,20 @@ class SimpleSnakeArrangement:
 
         self._reverse_first = reverse_first
 
+        # the arrangement is compiled into a lookup table over the pixel memory
+        size = (screen.width, screen.height)
+        self._pixel_map = PixelMap(
+            rows(size, serpentine=True, reverse_first=reverse_first),
+            size,
+            components=4,
+        )
+        self._mapped = numpy.frombuffer(self._interface.memory, dtype=numpy.uint8)
+
     def map(self, interface):
         """
         Map a standard pysicgl interface into the memory according to snake rules.
         """
-        seasnake.map_simple(
-            interface.memory, self._memory, self._screen.width, self._reverse_first
-        )
+        self._pixel_map.apply(interface.memory, out=self._mapped)
 
 
 class SnakeDriver(SimpleSnakeArrangement):
@@ -1,5 +1,5 @@
-import os
-from pathutils import rmdirr, ensure_dirs
+from pathutils import rmdirr
+from persistence import writer
 
 
 class Stack:
@@ -11,10 +11,9 @@ class Stack:
         """
         id = 0
         while True:
-            try:
-                os.stat(self._layer_path_by_id(id))
+            if writer.exists(self._layer_path_by_id(id)):
                 id += 1
-            except:
+            else:
                 yield id
 
     def __init__(self, path_prefix, id, layer_initializer):
@@ -23,16 +22,13 @@ class Stack:
         self._layers_path = f"{self._path}/layers"
         self._layer_id_generator = Stack.layer_id_generator(self)
 
-        # ensure that a directory exists for layers
-        ensure_dirs(self._layers_path)
-
         # layer map allows access to layers by id while layer stack
         # maintains the order of layers in composition
         self._layer_map = {}
         self._layer_stack = []
 
-        # load layers from the filesystem
-        for id in os.listdir(self._layers_path):
+        # load layers from storage
+        for id in writer.list(self._layers_path):
             id, path, _ = self.get_layer_info(id)
             print(id, path)
             layer = layer_initializer(id, path)
@@ -83,10 +79,12 @@ class Stack:
 
     def clear_layers(self):
         """remove all layers"""
+        for layer in self._layer_stack:
+            layer.release()
         self._layer_stack = []
         self._layer_map = {}
+        # storage creates the directory again when a layer is written
         rmdirr(self._layers_path)
-        os.mkdir(self._layers_path)
 
     def remove_layer_by_id(self, layerid):
         layer = self.get_layer_by_id(layerid)
@@ -100,8 +100,72 @@ void draw() {
   }
 }
 
+// frames sent with the delta encoding of the udp driver
+// (see src/drivers/delta.py for the reference implementation)
+int DELTA_HEADER_SIZE = 17;
+int DELTA_SPAN_SIZE = 8;
+byte[] delta_frame = null;
+long delta_sequence = -1;
+
+long readUint32(byte[] data, int offset) {
+  return (data[offset] & 0xFFL)
+    | ((data[offset + 1] & 0xFFL) << 8)
+    | ((data[offset + 2] & 0xFFL) << 16)
+    | ((data[offset + 3] & 0xFFL) << 24);
+}
+
+boolean isDeltaPacket(byte[] data) {
+  return data.length >= DELTA_HEADER_SIZE
+    && data[0] == 'H' && data[1] == 'S' && data[2] == 'D' && data[3] == '1';
+}
+
+// returns the current frame, or null when the packet could not be applied
+byte[] decodeDelta(byte[] data) {
+  int kind = data[4] & 0xFF;
+  long sequence = readUint32(data, 5);
+  long base = readUint32(data, 9);
+  int length = (int) readUint32(data, 13);
+
+  // keyframes hold the whole frame
+  if (kind == 0) {
+    if (data.length != DELTA_HEADER_SIZE + length) {
+      return null;
+    }
+    delta_frame = java.util.Arrays.copyOfRange(data, DELTA_HEADER_SIZE, data.length);
+    delta_sequence = sequence;
+    return delta_frame;
+  }
+
+  // deltas only apply to the frame they were made from
+  if (kind != 1 || delta_frame == null || base != delta_sequence || delta_frame.length != length) {
+    return null;
+  }
+
+  int position = DELTA_HEADER_SIZE;
+  while (position + DELTA_SPAN_SIZE <= data.length) {
+    int start = (int) readUint32(data, position);
+    int count = (int) readUint32(data, position + 4);
+    position += DELTA_SPAN_SIZE;
+    if (start + count > length || position + count > data.length) {
+      delta_frame = null;
+      return null;
+    }
+    System.arraycopy(data, position, delta_frame, start, count);
+    position += count;
+  }
+  delta_sequence = sequence;
+  return delta_frame;
+}
+
  void receive( byte[] data ) {       // <-- default handler
 //void receive( byte[] data, String ip, int port ) {  // <-- extended handler
+    if (isDeltaPacket(data)) {
+      data = decodeDelta(data);
+      if (data == null) {
+        return;
+      }
+    }
+
     int bpp = 4;
     int pixels_received = data.length / bpp;
     int pixels_in_display = LEDS_WIDTH * LEDS_HEIGHT;